@@ -0,0 +1,193 @@
+""" Batch simulation of battles between two armies, each a list of units
+
+Every unit in an army acts in the same phases as in stats.play_round: the active army moves, shoots and
+charges, its units fight, the other army's units strike back, and then every unit that lost wounds takes a
+battleshock test. Each unit picks its target with a targeting policy, and every pair of opposing units has its
+own distance. All battles are resolved together as in batch.Battles, with one set of array operations per unit
+and phase; an army loses once all of its units are slain.
+"""
+import numpy as np
+
+from batch import BATCH_SIZE, UNDECIDED, BatchUnit, roll, tally
+from cache import make_key, results_cache
+from dice import Dice
+from state import BattleStates, StateLayout
+from stats import ATTACKER, DEFENDER, DRAW, MAX_ROUNDS
+from weapons import WeaponTypes
+
+UNREACHABLE = np.iinfo(np.int64).max  # Distance given to targets that cannot be picked
+
+
+# Targeting policies: given the distance from a unit to each enemy unit (UNREACHABLE for enemies it cannot
+# pick) and the models left in each enemy unit, both as (battles, enemy units) arrays, return the index of the
+# enemy unit picked in each battle
+
+def nearest(distances, models):
+    return np.argmin(distances, axis=1)
+
+
+def weakest(distances, models):
+    return np.argmin(np.where(distances < UNREACHABLE, models, UNREACHABLE), axis=1)
+
+
+def strongest(distances, models):
+    return np.argmax(np.where(distances < UNREACHABLE, models, -1), axis=1)
+
+
+def policy_name(policy):
+    """ Module and qualified name of a targeting policy, or None for lambdas and local functions, which a name
+    does not identify
+    """
+    name = getattr(policy, '__qualname__', None)
+    if name is None or '<' in name:
+        return None
+    return '%s.%s' % (policy.__module__, name)
+
+
+class ArmyBattles:
+    """ State of many independent battles between two armies of BatchUnits, played in lockstep
+
+    :param distances: starting distance between the armies, the distance of each attacking unit from every
+                      defending unit, or a nested list of the distance between each attacking and defending unit
+    :param policy: targeting policy, see nearest
+    """
+
+    def __init__(self, attacking_army, defending_army, battles, distances=10, policy=nearest):
+        self.armies = (list(attacking_army), list(defending_army))
+        self.units = self.armies[0] + self.armies[1]
+        self.sides = ([*range(len(self.armies[0]))], [*range(len(self.armies[0]), len(self.units))])
+        self.policy = policy
+        shape = len(self.armies[0]), len(self.armies[1])
+        distances = np.asarray(distances)
+        distances = np.broadcast_to(distances[:, None] if distances.ndim == 1 else distances, shape)
+        self.state = BattleStates(StateLayout(*self.units, distances=distances.size), battles, distances)
+        self.winners = np.full(battles, UNDECIDED, dtype=np.int8)
+        self.index = np.arange(battles)
+        self.active = 0
+        self.rounds = 0
+
+    @property
+    def finished(self):
+        return not self.index.size
+
+    def step(self, rng):
+        a, d = self.active, 1 - self.active
+        state = self.state
+        battles = np.arange(len(state))
+        models = [state.models(unit) for unit in range(len(self.units))]
+        wounds = [state.wounds(unit) for unit in range(len(self.units))]
+        # distances[:, i, j] is the distance from the i-th active unit to the j-th unit of the other army
+        distances = state.all_distances().reshape(len(state), len(self.armies[0]), len(self.armies[1]))
+        if a:
+            distances = distances.transpose(0, 2, 1)
+        saves = [np.array([self.units[unit].save for unit in side]) for side in self.sides]
+        wounds_lost = [np.zeros(len(state), dtype=np.int64) for _ in self.units]
+        result = np.full(len(state), UNDECIDED, dtype=np.int8)
+
+        def models_left(side):
+            return np.stack([models[unit].sum(axis=1) for unit in self.sides[side]], axis=1)
+
+        def slain(side, winner):
+            result[(result == UNDECIDED) & (models_left(side).sum(axis=1) <= 0)] = winner
+
+        def pick_targets(side, unit_distances, reach=None):
+            """ Targets of one unit of `side`, or -1 in battles where it has none """
+            enemies = models_left(1 - side)
+            eligible = (enemies > 0) & (result == UNDECIDED)[:, None]
+            if reach is not None:
+                eligible &= unit_distances < reach
+            targets = self.policy(np.where(eligible, unit_distances, UNREACHABLE), enemies)
+            return np.where(eligible[battles, targets], targets, -1)
+
+        def attack(side, unit, unit_distances, weapon_type=WeaponTypes.COMBAT, reach=None):
+            """ Resolve an attack by one unit of `side` on the targets picked for it """
+            targets = pick_targets(side, unit_distances, reach)
+            attacking = targets >= 0
+            if not attacking.any():
+                return
+            target_distances = unit_distances[battles, targets]
+            wounds_dealt = self.units[unit].attack(rng, models[unit], target_distances, saves[1 - side][targets],
+                                                   weapon_type, attacking, targets)
+            for target, enemy in enumerate(self.sides[1 - side]):
+                damage = np.where(targets == target, wounds_dealt, 0)
+                self.units[enemy].assign_wounds(models[enemy], wounds[enemy], damage)
+                wounds_lost[enemy] += damage
+
+        for i, unit in enumerate(self.sides[a]):
+            targets = pick_targets(a, distances[:, i, :])
+            moving = targets >= 0
+            current = distances[battles[moving], i, targets[moving]]
+            distances[battles[moving], i, targets[moving]] = np.where(
+                current > 3, np.maximum(current - self.units[unit].movement, 3), current)
+
+        for i, unit in enumerate(self.sides[a]):
+            attack(a, unit, distances[:, i, :], WeaponTypes.SHOOTING)
+        slain(d, a)
+
+        for i, unit in enumerate(self.sides[a]):
+            targets = pick_targets(a, distances[:, i, :])
+            current = distances[battles, i, targets]
+            charging = (targets >= 0) & (current >= 3) & (current <= 12) & (models[unit].sum(axis=1) > 0)
+            charge_roll = roll(rng, Dice.D6, (len(state), 2)).sum(axis=1)
+            charged = charging & (charge_roll >= current)
+            distances[battles[charged], i, targets[charged]] = 0
+
+        for i, unit in enumerate(self.sides[a]):
+            attack(a, unit, distances[:, i, :], reach=3)
+        slain(d, a)
+        for j, unit in enumerate(self.sides[d]):
+            attack(d, unit, distances[:, :, j], reach=3)
+        slain(a, d)
+
+        for side, winner in ((d, a), (a, d)):
+            for unit in self.sides[side]:
+                self.units[unit].battleshock(rng, models[unit], wounds[unit],
+                                             np.where(result == UNDECIDED, wounds_lost[unit], 0))
+            slain(side, winner)
+
+        decided = result != UNDECIDED
+        self.winners[self.index[decided]] = result[decided]
+        self.index = self.index[~decided]
+        state.keep(~decided)
+        self.active = d
+        self.rounds += 1
+
+    def run(self, rng, max_rounds=MAX_ROUNDS):
+        """ Play until every battle is decided or max_rounds battle rounds have been played
+
+        :returns: array holding the index (0 for the attacking army, 1 for the defending army) of each winner,
+                  UNDECIDED for battles that were drawn
+        """
+        while not self.finished and self.rounds < max_rounds:
+            self.step(rng)
+        return self.winners
+
+
+def run_army_simulation(attacking_army, defending_army, simulations_to_run=100, distances=10, policy=nearest,
+                        seed=None, batch_size=BATCH_SIZE, max_rounds=MAX_ROUNDS):
+    """ Play battles between two armies, lists of units built from UNITS, and tally the results
+
+    Each unit's weapons are resolved with its declarative abilities against every enemy unit. Seeded runs are
+    memoized in the results cache, as in batch.run_batch_simulation, unless the policy is a lambda or a local
+    function.
+
+    :param distances: see ArmyBattles
+    :param policy: targeting policy: nearest, weakest, strongest or any function taking the same arguments
+    """
+    def simulate():
+        rng = np.random.default_rng(seed)
+        armies = [[BatchUnit(unit, defending_army) for unit in attacking_army],
+                  [BatchUnit(unit, attacking_army) for unit in defending_army]]
+        results = {ATTACKER: 0, DEFENDER: 0, DRAW: 0}
+        for start in range(0, simulations_to_run, batch_size):
+            battles = ArmyBattles(*armies, min(batch_size, simulations_to_run - start), distances, policy)
+            tally(battles.run(rng, max_rounds), results)
+        return results
+
+    name = policy_name(policy)
+    if seed is None or name is None:
+        return simulate()
+    key = make_key('run_army_simulation', [unit.fingerprint(unit.model_counts) for unit in attacking_army],
+                   [unit.fingerprint(unit.model_counts) for unit in defending_army], simulations_to_run,
+                   np.asarray(distances).tolist(), name, seed, batch_size, max_rounds)
+    return results_cache.get_or_compute(key, simulate)
@@ -0,0 +1,571 @@
+import hashlib
+import math
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+import profiling
+import tables
+from cache import make_key, results_cache
+from dice import Dice, as_dice
+from events import Phases
+from state import BattleStates, StateLayout
+from unit import removal_order
+from stats import ATTACKER, DEFENDER, DRAW, MAX_ROUNDS
+from weapons import WeaponTypes
+
+BATCH_SIZE = 100000  # Number of battles held in memory at once
+SWEEP_DISTANCES = range(0, 31)  # Starting distances of a distance sweep, in inches
+STREAM_BATCH_SIZE = 10000  # Battles played between updates of a streamed simulation
+Z_95 = 1.959964  # Standard normal quantile for 95% confidence intervals
+
+UNDECIDED = -1
+
+# tables.save_roll indexed by save + rend - tables.MIN_NEEDED, for looking up a different save in every battle
+SAVE_ROLLS = np.array([tables.save_roll(needed) for needed in range(tables.MIN_NEEDED, tables.MAX_NEEDED + 1)])
+
+
+def roll(rng, dice, size):
+    return rng.integers(1, dice.sides + 1, size=size, dtype=np.int8)
+
+
+def substream(rng, *key, battles=None):
+    """ The dice for one step of a battle: rng's substream for key if it is a KeyedDice, rng itself otherwise """
+    return rng.substream(*key, battles=battles) if isinstance(rng, KeyedDice) else rng
+
+
+def roll_successes(rng, dice_counts, needed, reroll_below=1):
+    """ Roll a variable number of D6 per battle and count the dice that rolled at least `needed`
+
+    Dice that rolled less than reroll_below (see tables.reroll_below) are rolled again.
+
+    :param needed: the roll needed in every battle, or an array of the roll needed in each battle
+    :param reroll_below: likewise, for re-rolls
+    """
+    most = int(dice_counts.max(initial=0))
+    if most <= 0:
+        return np.zeros(len(dice_counts), dtype=np.int64)
+    rolls = roll(rng, Dice.D6, (len(dice_counts), most))
+    rerolled = rolls < np.expand_dims(reroll_below, -1)
+    if rerolled.any():
+        rolls = np.where(rerolled, roll(substream(rng, 'reroll'), Dice.D6, rolls.shape), rolls)
+    rolled = np.arange(most) < dice_counts[:, None]
+    return np.count_nonzero((rolls >= np.expand_dims(needed, -1)) & rolled, axis=1)
+
+
+def save_roll(target_save, rend):
+    """ tables.save_roll for a single save and rend, or arrays of them with one per battle """
+    if np.ndim(target_save) or np.ndim(rend):
+        return SAVE_ROLLS[np.clip(target_save + rend, tables.MIN_NEEDED, tables.MAX_NEEDED) - tables.MIN_NEEDED]
+    return tables.save_roll(target_save, rend)
+
+
+def roll_sum(rng, dice_counts, dice):
+    """ Roll a variable number of dice per battle and return the total for each battle """
+    most = int(dice_counts.max(initial=0))
+    if most <= 0:
+        return np.zeros(len(dice_counts), dtype=np.int64)
+    rolls = roll(rng, dice, (len(dice_counts), most))
+    rolled = np.arange(most) < dice_counts[:, None]
+    return np.where(rolled, rolls, 0).sum(axis=1)
+
+
+def deal_damage(rng, unsaved, damage):
+    return unsaved * damage if isinstance(damage, int) else roll_sum(rng, unsaved, damage)
+
+
+def per_target(values, dtype=None):
+    """ A characteristic that is the same against every target, or an array of its value against each target """
+    return values[0] if all(value == values[0] for value in values) else np.array(values, dtype=dtype)
+
+
+def against(value, targets):
+    return value[targets] if isinstance(value, np.ndarray) else value
+
+
+class BatchWeapon:
+    """ A weapon's resolved profile against one or more targets
+
+    Characteristics that differ between the targets (abilities can change them, see modifiers.py) are held as
+    arrays indexed by target, so they can be looked up for a different target in every battle.
+    """
+
+    def __init__(self, slot, *weapons):
+        weapon = weapons[0]
+        self.slot = slot
+        self.name = weapon.name
+        self.weapon_type = weapon.weapon_type
+        self.weapon_range = weapon.weapon_range
+        self.attacks = as_dice(weapon.attacks)
+        self.bonus_attacks = per_target([weapon.bonus_attacks for weapon in weapons])
+        self.extra_attacks = per_target([weapon.extra_attacks for weapon in weapons])
+        self.hit_roll = per_target([tables.hit_roll(weapon.to_hit) for weapon in weapons])
+        self.wound_roll = per_target([tables.hit_roll(weapon.to_wound) for weapon in weapons])
+        self.hit_reroll = per_target([tables.reroll_below(weapon.hit_rerolls, tables.hit_roll(weapon.to_hit))
+                                      for weapon in weapons])
+        self.wound_reroll = per_target([tables.reroll_below(weapon.wound_rerolls, tables.hit_roll(weapon.to_wound))
+                                        for weapon in weapons])
+        self.rend = per_target([weapon.rend for weapon in weapons])
+        # Damage stays a Python int or Dice against each target, as deal_damage expects
+        self.damage = per_target([as_dice(weapon.damage) for weapon in weapons], dtype=object)
+
+
+class BatchUnit:
+    """ Read-only snapshot of a unit's profile used to play many battles at once
+
+    Each model type in the unit gets a fixed slot, so the models remaining in N battles are held in an
+    (N, slots) array rather than a dict per battle.
+
+    :param targets: units this unit will attack; when given, weapons are resolved against each of them with the
+                    unit's declarative abilities as well as its current modifiers (Unit.resolve_against)
+    """
+
+    def __init__(self, unit, targets=None):
+        self.name = unit.name
+        self.movement = unit.movement
+        self.save = unit.save
+        self.bravery = unit.bravery
+        self.wounds = unit.wounds
+        models = list(unit.model_counts)
+        self.counts = np.array([unit.model_counts[model] for model in models], dtype=np.int64)
+        if targets is None:
+            self.weapons = [BatchWeapon(slot, unit.resolve(weapon))
+                            for slot, model in enumerate(models) for weapon in model.weapons]
+        else:
+            resolved = [unit.resolve_against(target) for target in targets]
+            self.weapons = [BatchWeapon(slot, *(profiles[weapon] for profiles in resolved))
+                            for slot, model in enumerate(models) for weapon in model.weapons]
+        self.removal_order = [models.index(model) for model in removal_order(models)]
+
+    def attack(self, rng, models, distances, target_save, weapon_type=WeaponTypes.COMBAT, engaged=None,
+               targets=None):
+        """ Wounds dealt in each battle, against a target save that may differ between battles
+
+        :param targets: index of the target attacked in each battle, if the unit was built with targets
+        """
+        total_damage = np.zeros(len(distances), dtype=np.int64)
+        for weapon in self.weapons:
+            if weapon.weapon_type != weapon_type:
+                continue
+            count = models[:, weapon.slot]
+            attacking = (weapon.weapon_range >= distances) & (count > 0)
+            if engaged is not None:
+                attacking &= engaged
+            if not attacking.any():
+                continue
+            dice = substream(rng, weapon.slot, weapon.name)
+            attacks = weapon.attacks if isinstance(weapon.attacks, int) else roll(substream(dice, 'attacks'),
+                                                                                  weapon.attacks, len(count))
+            attacks = (count * (attacks + against(weapon.bonus_attacks, targets))
+                       + against(weapon.extra_attacks, targets))
+            attacks = np.where(attacking, np.maximum(attacks, 0), 0)
+            if profiling.profiler.enabled:
+                profiling.profiler.count_rolls(weapon.name, int(attacks.sum()))
+            hits = roll_successes(substream(dice, 'hit'), attacks, against(weapon.hit_roll, targets),
+                                  against(weapon.hit_reroll, targets))
+            wounding_hits = roll_successes(substream(dice, 'wound'), hits, against(weapon.wound_roll, targets),
+                                           against(weapon.wound_reroll, targets))
+            unsaved = wounding_hits - roll_successes(substream(dice, 'save'), wounding_hits,
+                                                     save_roll(target_save, against(weapon.rend, targets)))
+            if isinstance(weapon.damage, np.ndarray):
+                # Whole rows are rolled for each target, so every battle's damage dice stay in the same place
+                for target, damage in enumerate(weapon.damage):
+                    attacked = targets == target
+                    total_damage += deal_damage(substream(dice, 'damage', target), np.where(attacked, unsaved, 0),
+                                                damage)
+            else:
+                total_damage += deal_damage(substream(dice, 'damage'), unsaved, weapon.damage)
+        return total_damage
+
+    def remove_models(self, models, models_slain):
+        for slot in self.removal_order:
+            removed = np.minimum(models[:, slot], models_slain)
+            models[:, slot] -= removed
+            models_slain = models_slain - removed
+
+    def assign_wounds(self, models, wounds_remaining, damage):
+        models_slain, spill = np.divmod(damage, self.wounds)
+        self.remove_models(models, models_slain)
+        wounds_remaining -= spill
+        overkill = wounds_remaining <= 0
+        self.remove_models(models, overkill.astype(np.int64))
+        # Allocate remaining wounds and account for overkill
+        wounds_remaining[overkill] += self.wounds
+
+    def battleshock(self, rng, models, wounds_remaining, models_lost):
+        battleshock_test = models_lost + roll(rng, Dice.D6, len(models_lost))
+        fled = (models_lost > 0) & (self.bravery < battleshock_test)
+        fleeing_models = np.where(fled, np.minimum(battleshock_test - self.bravery, models.sum(axis=1)), 0)
+        self.remove_models(models, fleeing_models)
+        wounds_remaining[fled] = self.wounds
+
+
+def batch_units(attacking_unit, defending_unit):
+    """ BatchUnits for both sides of a battle, each with its declarative abilities resolved against the other """
+    return BatchUnit(attacking_unit, [defending_unit]), BatchUnit(defending_unit, [attacking_unit])
+
+
+class Battles:
+    """ State of many independent battles between two BatchUnits, played in lockstep one battle round at a time
+
+    Every live battle shares the same active side in a given round, so each phase is resolved for all of
+    them with a handful of array operations. The state of every battle is held in one state.BattleStates block;
+    battles are dropped from it as soon as they are decided, and the whole batch can be stepped, paused and
+    resumed like stats.Battle.
+    """
+
+    def __init__(self, attacking_unit, defending_unit, battles, distance=10):
+        self.units = (attacking_unit, defending_unit)
+        self.winners = np.full(battles, UNDECIDED, dtype=np.int8)
+        self.index = np.arange(battles)
+        self.state = BattleStates(StateLayout(*self.units), battles, distance)
+        self.active = 0
+        self.rounds = 0
+
+    @property
+    def finished(self):
+        return not self.index.size
+
+    def step(self, rng):
+        a, d = self.active, 1 - self.active
+        attacker, defender = self.units[a], self.units[d]
+        state = self.state
+        models, wounds = [state.models(0), state.models(1)], [state.wounds(0), state.wounds(1)]
+        result = np.full(self.index.size, UNDECIDED, dtype=np.int8)
+        profiler = profiling.profiler
+
+        def slain(side, winner):
+            result[(result == UNDECIDED) & (models[side].sum(axis=1) <= 0)] = winner
+
+        rng = substream(rng, self.rounds, battles=self.index)
+        if profiler.enabled:
+            profiler.start(Phases.SHOOTING.value)
+        distances = state.distances
+        distances = np.where(distances > 3, np.maximum(distances - attacker.movement, 3), distances)
+
+        wounds_dealt = attacker.attack(substream(rng, 'shooting', a), models[a], distances, defender.save,
+                                      WeaponTypes.SHOOTING)
+        defender.assign_wounds(models[d], wounds[d], wounds_dealt)
+        defender_lost = wounds_dealt
+        slain(d, a)
+
+        if profiler.enabled:
+            profiler.start(Phases.CHARGE.value)
+        charging = (distances >= 3) & (distances <= 12)
+        charge_roll = roll(substream(rng, 'charge'), Dice.D6, (self.index.size, 2)).sum(axis=1)
+        distances = np.where(charging & (charge_roll >= distances), 0, distances)
+
+        if profiler.enabled:
+            profiler.start(Phases.COMBAT.value)
+        engaged = (distances < 3) & (result == UNDECIDED)
+        if engaged.any():
+            wounds_dealt = attacker.attack(substream(rng, 'combat', a), models[a], distances, defender.save,
+                                          engaged=engaged)
+            defender.assign_wounds(models[d], wounds[d], wounds_dealt)
+            defender_lost = defender_lost + wounds_dealt
+            slain(d, a)
+
+            engaged &= result == UNDECIDED
+            wounds_dealt = defender.attack(substream(rng, 'combat', d), models[d], distances, attacker.save,
+                                          engaged=engaged)
+            attacker.assign_wounds(models[a], wounds[a], wounds_dealt)
+            attacker_lost = wounds_dealt
+            slain(a, d)
+        else:
+            attacker_lost = np.zeros(self.index.size, dtype=np.int64)
+
+        if profiler.enabled:
+            profiler.start(Phases.BATTLESHOCK.value)
+        defender.battleshock(substream(rng, 'battleshock', d), models[d], wounds[d],
+                             np.where(result == UNDECIDED, defender_lost, 0))
+        slain(d, a)
+        attacker.battleshock(substream(rng, 'battleshock', a), models[a], wounds[a],
+                             np.where(result == UNDECIDED, attacker_lost, 0))
+        slain(a, d)
+
+        decided = result != UNDECIDED
+        self.winners[self.index[decided]] = result[decided]
+        live = ~decided
+        state.distances = distances
+        self.index = self.index[live]
+        state.keep(live)
+        self.active = d
+        self.rounds += 1
+        if profiler.enabled:
+            profiler.stop()
+
+    def run(self, rng, max_rounds=MAX_ROUNDS):
+        """ Play until every battle is decided or max_rounds battle rounds have been played
+
+        :returns: array holding the index (0 for the attacking unit, 1 for the defending unit) of each winner,
+                  UNDECIDED for battles that were drawn
+        """
+        while not self.finished and self.rounds < max_rounds:
+            self.step(rng)
+        return self.winners
+
+
+def simulate_battles(rng, attacking_unit, defending_unit, battles, distance=10, max_rounds=MAX_ROUNDS):
+    return Battles(attacking_unit, defending_unit, battles, distance).run(rng, max_rounds)
+
+
+def tally(winners, results):
+    results[ATTACKER] += int(np.count_nonzero(winners == 0))
+    results[DEFENDER] += int(np.count_nonzero(winners == 1))
+    results[DRAW] += int(np.count_nonzero(winners == UNDECIDED))
+    return results
+
+
+def simulate_results(rng, attacker, defender, simulations_to_run, distance, batch_size=BATCH_SIZE,
+                     max_rounds=MAX_ROUNDS):
+    results = {ATTACKER: 0, DEFENDER: 0, DRAW: 0}
+    for start in range(0, simulations_to_run, batch_size):
+        tally(simulate_battles(rng, attacker, defender, min(batch_size, simulations_to_run - start), distance,
+                               max_rounds), results)
+    return results
+
+
+def run_batch_simulation(attacking_unit, defending_unit, simulations_to_run=100, distance=10, seed=None,
+                         batch_size=BATCH_SIZE, max_rounds=MAX_ROUNDS):
+    """ Vectorised equivalent of stats.run_simulation
+
+    Plays every battle silently and returns the same attacker/defender/draw tallies. Seeded runs are
+    deterministic, so their results are memoized in the results cache.
+    """
+    def simulate():
+        return simulate_results(np.random.default_rng(seed), *batch_units(attacking_unit, defending_unit),
+                                simulations_to_run, distance, batch_size, max_rounds)
+
+    if seed is None:
+        return simulate()
+    key = make_key('run_batch_simulation', attacking_unit.fingerprint(attacking_unit.model_counts),
+                   defending_unit.fingerprint(defending_unit.model_counts), simulations_to_run, distance, seed,
+                   batch_size, max_rounds)
+    return results_cache.get_or_compute(key, simulate)
+
+
+def sweep_group(attacker, defending_unit, distance):
+    """ Starting distances in the same group play out identically, so a sweep only simulates one of each
+
+    Every distance with the same distance after the first move does, and so do distances that end up within 3"
+    (where they stay for the rest of the battle) if the same weapons of both units are in range.
+    """
+    if distance > 3:
+        distance = max(distance - attacker.movement, 3)
+    if distance >= 3:
+        return distance
+    return tuple(weapon.weapon_range >= distance for unit in (attacker, defending_unit) for weapon in unit.weapons)
+
+
+def sweep_distances(attacking_unit, defending_unit, distances=SWEEP_DISTANCES, simulations_to_run=100, seed=None,
+                    batch_size=BATCH_SIZE, max_rounds=MAX_ROUNDS):
+    """ Chance of each result for every starting distance, from one batch simulation per group of distances
+
+    Every group is played with the same dice stream, so differences between distances come from the distance
+    rather than the dice. Seeded sweeps are memoized in the results cache.
+
+    :returns: dict of lists giving the chance of each result, in the order of distances
+    """
+    distances = list(distances)
+    entropy = np.random.SeedSequence(seed).entropy
+
+    def simulate():
+        attacker, defender = batch_units(attacking_unit, defending_unit)
+        groups = {}
+        for distance in distances:
+            groups.setdefault(sweep_group(attacker, defender, distance), distance)
+        results = {group: simulate_results(np.random.default_rng(entropy), attacker, defender, simulations_to_run,
+                                           distance, batch_size, max_rounds)
+                   for group, distance in groups.items()}
+        curve = [results[sweep_group(attacker, defender, distance)] for distance in distances]
+        return {result: [counts[result] / simulations_to_run for counts in curve]
+                for result in (ATTACKER, DEFENDER, DRAW)}
+
+    if seed is None:
+        return simulate()
+    key = make_key('sweep_distances', attacking_unit.fingerprint(attacking_unit.model_counts),
+                   defending_unit.fingerprint(defending_unit.model_counts), distances, simulations_to_run, seed,
+                   batch_size, max_rounds)
+    return results_cache.get_or_compute(key, simulate)
+
+
+MASK = (1 << 64) - 1
+
+
+def mix(x):
+    """ splitmix64's finaliser, scrambling an array of uint64 (or a Python int) into an unrelated one """
+    if isinstance(x, int):
+        x = (x ^ (x >> 30)) * 0xbf58476d1ce4e5b9 & MASK
+        x = (x ^ (x >> 27)) * 0x94d049bb133111eb & MASK
+        return x ^ (x >> 31)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+
+@lru_cache(maxsize=None)
+def key_hash(part):
+    return int.from_bytes(hashlib.blake2b(repr(part).encode(), digest_size=8).digest(), 'little')
+
+
+class KeyedDice:
+    """ Dice that are a fixed function of the battle, the step of the battle and the position of the die
+
+    A numpy Generator hands out dice in order, so when one unit rolls an extra die every later die of every
+    battle in the batch shifts along. KeyedDice instead hashes (entropy, key, battle, column) into each die: the
+    key names the step (the round, phase, weapon and roll, see substream), the battle is its number in the run and
+    the column is the die's position in its row. Two runs from the same entropy, e.g. with and without a buff,
+    then roll the same die wherever they make the same roll, however many dice either rolled before it.
+
+    :param first_battle: number of the run's first battle in this batch, so batches get different dice
+    :param antithetic: mirror every die, so a D6 that would have rolled x rolls 7 - x
+    """
+
+    def __init__(self, entropy, first_battle=0, antithetic=False):
+        self.key = key_hash(entropy)
+        self.first_battle = first_battle
+        self.antithetic = antithetic
+        self.battles = None
+
+    def substream(self, *key, battles=None):
+        """ Dice for the step named by key; battles are the batch indices of the rows about to be rolled """
+        dice = KeyedDice.__new__(KeyedDice)
+        dice.key = mix(self.key ^ key_hash(key))
+        dice.first_battle = self.first_battle
+        dice.antithetic = self.antithetic
+        dice.battles = self.battles if battles is None else np.asarray(battles, dtype=np.uint64) + np.uint64(
+            self.first_battle)
+        return dice
+
+    def integers(self, low, high, size=None, dtype=np.int64):
+        shape = (size,) if np.ndim(size) == 0 else tuple(size)
+        columns = int(np.prod(shape[1:], dtype=np.int64))
+        x = mix(self.battles[:, None] * np.uint64(0x9e3779b97f4a7c15) ^ np.uint64(self.key))
+        x = mix(x + np.arange(1, columns + 1, dtype=np.uint64) * np.uint64(0xd1b54a32d192ed03))
+        values = low + (x % np.uint64(high - low)).astype(dtype)
+        if self.antithetic:
+            values = low + high - 1 - values
+        return values.reshape(shape)
+
+
+# Result of a paired comparison: the attacker's win rate without and with a buff or loadout, the difference
+# between them and its (low, high) confidence interval
+Comparison = namedtuple('Comparison', ['baseline', 'variant', 'difference', 'interval'])
+
+
+def attacker_wins(entropy, attacker, defender, simulations_to_run, distance, antithetic=False,
+                  batch_size=BATCH_SIZE, max_rounds=MAX_ROUNDS):
+    """ 1 for every battle the attacker won and 0 otherwise, playing battle n from the same KeyedDice every time
+
+    With antithetic, every battle is also played with mirrored dice and the two results are averaged.
+    """
+    wins = np.zeros(simulations_to_run)
+    for mirrored in ((False, True) if antithetic else (False,)):
+        winners = np.concatenate([
+            simulate_battles(KeyedDice(entropy, start, mirrored), attacker, defender,
+                             min(batch_size, simulations_to_run - start), distance, max_rounds)
+            for start in range(0, simulations_to_run, batch_size)])
+        wins += winners == 0
+    return wins / (2 if antithetic else 1)
+
+
+def compare_variants(attacking_unit, defending_unit, buffs=None, loadouts=None, simulations_to_run=100, distance=10,
+                     seed=None, antithetic=False, batch_size=BATCH_SIZE, max_rounds=MAX_ROUNDS):
+    """ Compare the attacker's win rate with each buff or loadout against its win rate without, on paired battles
+
+    Battle n of the baseline and of every variant is played from the same KeyedDice (common random numbers), so most
+    of the noise cancels out of the difference and far fewer battles are needed for the same precision. Every
+    unit has its abilities applied against defending_unit first, as in stats.calculate_attacks_vs_target.
+
+    :param buffs: {name: buff} to apply to attacking_unit in turn, its own buffs by default
+    :param loadouts: {name: unit} of alternative attacking units, e.g. with other models or weapons
+    :param antithetic: also play every battle with mirrored dice, doubling the battles played
+    :returns: dict of each buff or loadout name to its Comparison
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    defender = BatchUnit(defending_unit, [attacking_unit])
+
+    def prepare(unit, buff=None):
+        unit.reset_buffs()
+        for ability in unit.abilities:
+            ability(defending_unit)
+        if buff:
+            buff(unit, defending_unit)
+        prepared = BatchUnit(unit)
+        unit.reset_buffs()
+        return prepared
+
+    variants = {name: prepare(attacking_unit, buff)
+                for name, buff in (attacking_unit.buffs if buffs is None else buffs).items()}
+    variants.update({name: prepare(unit) for name, unit in (loadouts or {}).items()})
+
+    baseline = attacker_wins(entropy, prepare(attacking_unit), defender, simulations_to_run, distance, antithetic,
+                             batch_size, max_rounds)
+    comparisons = {}
+    for name, attacker in variants.items():
+        wins = attacker_wins(entropy, attacker, defender, simulations_to_run, distance, antithetic, batch_size,
+                             max_rounds)
+        differences = wins - baseline
+        difference = float(differences.mean())
+        spread = Z_95 * float(differences.std(ddof=1)) / math.sqrt(simulations_to_run) if simulations_to_run > 1 \
+            else math.inf
+        comparisons[name] = Comparison(float(baseline.mean()), float(wins.mean()), difference,
+                                       (difference - spread, difference + spread))
+    return comparisons
+
+
+# Running tallies of a streamed simulation, with a (low, high) confidence interval for the chance of each result
+Progress = namedtuple('Progress', ['results', 'simulations', 'intervals', 'elapsed'])
+
+
+def confidence_interval(successes, trials, z=Z_95):
+    """ Wilson score interval for a proportion, which stays within [0, 1] for results that are (nearly) certain """
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    centre = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    spread = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return max(centre - spread, 0.0), min(centre + spread, 1.0)
+
+
+def half_width(progress):
+    """ Widest confidence interval half-width over all results """
+    return max((high - low) / 2 for low, high in progress.intervals.values())
+
+
+def precise_to(epsilon):
+    """ Stop condition: every result's confidence interval half-width is at most epsilon """
+    return lambda progress: half_width(progress) <= epsilon
+
+
+def time_budget(seconds):
+    """ Stop condition: the simulation has run for at least `seconds` """
+    return lambda progress: progress.elapsed >= seconds
+
+
+def stream_batch_simulation(attacking_unit, defending_unit, distance=10, seed=None, simulations_to_run=None,
+                            stop=None, batch_size=STREAM_BATCH_SIZE, max_rounds=MAX_ROUNDS):
+    """ Play battles a batch at a time, yielding the running tallies after every batch
+
+    Runs until simulations_to_run battles have been played or the stop condition (called with each Progress,
+    e.g. precise_to or time_budget) returns True; with neither, it runs until the caller stops iterating.
+
+    :rtype: generator of Progress
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    attacker, defender = batch_units(attacking_unit, defending_unit)
+    results = {ATTACKER: 0, DEFENDER: 0, DRAW: 0}
+    simulations = 0
+    while simulations_to_run is None or simulations < simulations_to_run:
+        battles = batch_size if simulations_to_run is None else min(batch_size, simulations_to_run - simulations)
+        tally(simulate_battles(rng, attacker, defender, battles, distance, max_rounds), results)
+        simulations += battles
+        progress = Progress(dict(results), simulations,
+                            {result: confidence_interval(count, simulations) for result, count in results.items()},
+                            time.perf_counter() - start)
+        yield progress
+        if stop is not None and stop(progress):
+            return
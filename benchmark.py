@@ -0,0 +1,133 @@
+""" Benchmarks for unit construction, catalog loading, damage calculation and simulation
+
+Run from the project root:
+
+    python benchmark.py --output benchmark.json --compare previous.json
+
+Every benchmark runs against an in-memory database built from the .sql files, with a fixed seed.
+Results are written as JSON so they can be compared between commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from data import database
+
+# Build the catalog before anything loads units from it
+database.connect(':memory:')
+database.initialize_db()
+
+import dice  # noqa: E402
+import stats  # noqa: E402
+from batch import run_batch_simulation  # noqa: E402
+from cache import results_cache  # noqa: E402
+from dice import DiceRoller  # noqa: E402
+from registry import register_units  # noqa: E402
+from stats import UNITS  # noqa: E402
+
+SEED = 1
+TRIALS = (1000, 10000, 100000)
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Every unit module can only be imported once per process, so loading them all is timed in a fresh interpreter
+IMPORT_UNITS = "import stats, units; stats.import_units(units)"
+
+
+def build_matchup():
+    attacking_unit = UNITS['Arkanaut Company']()
+    attacking_unit.add_models('Arkanaut', 6)
+    attacking_unit.add_models('Arkanaut with Light Skyhook', 3)
+    attacking_unit.add_models('Arkanaut Captain', 1)
+    defending_unit = UNITS['Wildwood Rangers']()
+    defending_unit.add_models('Ranger', 9)
+    defending_unit.add_models('Warden', 1)
+    return attacking_unit, defending_unit
+
+
+def measure(fn, setup=None, min_time=0.5, max_calls=1000):
+    """ Call fn repeatedly (running setup untimed before each call) for at least min_time seconds
+
+    :returns: dict with the number of calls and the best and mean time per call in seconds
+    """
+    timings = []
+    while not timings or (sum(timings) < min_time and len(timings) < max_calls):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {'calls': len(timings), 'best': min(timings), 'mean': sum(timings) / len(timings)}
+
+
+def cold_start(code):
+    """ Run code in a new interpreter from the project root, e.g. to time imports the first time they happen """
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+
+def benchmarks(trials, seed=SEED):
+    attacking_unit, defending_unit = build_matchup()
+
+    def simulate_combat():
+        stats.simulate_combat(attacking_unit, defending_unit, 10)
+        attacking_unit.reset()
+        defending_unit.reset()
+
+    yield 'unit_construction', measure(lambda: UNITS['Arkanaut Company']())
+    yield 'register_units', measure(register_units, setup=UNITS.clear)
+    yield 'import_units_cold_start', measure(lambda: cold_start(IMPORT_UNITS), max_calls=10)
+    yield 'interpreter_start', measure(lambda: cold_start(''), max_calls=10)
+    yield 'calculate_damage_fixed', measure(lambda: stats.calculate_damage(20, 4, 4, 1, 2, 4))
+    yield 'calculate_damage_dice', measure(lambda: stats.calculate_damage(20, 4, 3, 2, DiceRoller.d3, 4))
+    yield 'simulate_combat', measure(simulate_combat)
+    for n in trials:
+        yield 'run_simulation_%d' % n, measure(
+            lambda: stats.run_simulation(attacking_unit, defending_unit, n, 10), min_time=0, max_calls=1)
+        yield 'run_batch_simulation_%d' % n, measure(
+            lambda: run_batch_simulation(attacking_unit, defending_unit, n, 10, seed=seed),
+            setup=results_cache.clear, min_time=0, max_calls=3)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    for name, result in results.items():
+        if name in previous['results']:
+            ratio = result['best'] / previous['results'][name]['best']
+            print("%40s |%14.6fs |%14.6fs |%8.2fx" % (name, previous['results'][name]['best'], result['best'], ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--trials', type=int, nargs='+', default=TRIALS)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    dice.seed(args.seed)
+    results = {}
+    for name, result in benchmarks(args.trials, args.seed):
+        results[name] = result
+        print("%40s |%8d calls |%14.6fs best |%14.6fs mean" % (name, result['calls'], result['best'], result['mean']))
+
+    with open(args.output, 'w') as output:
+        json.dump({'commit': git_commit(), 'python': platform.python_version(), 'seed': args.seed,
+                   'results': results}, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as previous:
+            print("\n%40s |%15s |%15s |%9s" % ("Benchmark", "Previous", "Current", "Ratio"))
+            compare(results, json.load(previous))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+from data import database
+
+DISK_CACHE_NAME = '%s%s%s' % (os.path.dirname(database.DB_NAME), os.path.sep, 'cache.db')
+
+
+def make_key(*parts):
+    """ Stable hash of JSON-serialisable parts, identical across processes and runs """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """ Memoizes matchup results by key, with an in-memory LRU tier and an optional on-disk SQLite tier
+
+    Values must be JSON-serialisable. Both tiers hold the serialised JSON and every hit returns a fresh copy, so
+    callers are free to modify results. The cache is cleared whenever database.initialize_db reloads the schema.
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.disk = None
+        if path:
+            self.enable_disk(path)
+        database.add_reload_listener(self.clear)
+
+    def enable_disk(self, path=DISK_CACHE_NAME):
+        self.disk = sqlite3.connect(path, check_same_thread=False)
+        self.disk.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.disk.commit()
+
+    def get(self, key, default=None):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return json.loads(self.memory[key])
+        if self.disk:
+            row = self.disk.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+            if row:
+                self.remember(key, row[0])
+                return json.loads(row[0])
+        return default
+
+    def set(self, key, value):
+        # Return the value as it will come back from the cache, so hits and misses return the same types
+        serialised = json.dumps(value)
+        self.remember(key, serialised)
+        if self.disk:
+            self.disk.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, serialised))
+            self.disk.commit()
+        return json.loads(serialised)
+
+    def remember(self, key, serialised):
+        self.memory[key] = serialised
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        return self.set(key, compute()) if value is None else value
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk:
+            self.disk.execute("DELETE FROM results")
+            self.disk.commit()
+
+
+results_cache = ResultCache()
@@ -0,0 +1,49 @@
+import json
+import os
+
+from data import database
+from data.repository import ModelTemplate, NoSuchUnitException, UnitTemplate
+from model import Model
+from weapons import WeaponProfile
+
+JSON_NAME = '%s%s%s' % (os.path.dirname(os.path.dirname(os.path.abspath(__file__))), os.path.sep, 'units.json')
+
+
+class JsonCatalog:
+    """ Unit catalog read from units.json, interchangeable with repository.UnitRepository
+
+    The file is parsed once into the same immutable UnitTemplates, so units can be built with no database
+    at all. Models may give a "type" and units a list of "keywords"; both are optional. Every unit in the .sql
+    files must be described the same way here, so either catalog builds the same units.
+    """
+
+    def __init__(self, path=JSON_NAME):
+        self.path = path
+        self.templates = None
+
+    def load(self):
+        with open(self.path) as catalog:
+            units = json.load(catalog)
+        self.templates = {}
+        for unit_id, (name, unit) in enumerate(units.items(), start=1):
+            models = tuple(
+                ModelTemplate(None, model_name, model.get('type', Model.BASE_TYPE), tuple(
+                    WeaponProfile(weapon_name, weapon['range'], database.to_profile_value(weapon['attacks']),
+                                  weapon['to_hit'], weapon['to_wound'], weapon['rend'],
+                                  database.to_profile_value(weapon['damage']))
+                    for weapon_name, weapon in model['weapons'].items()))
+                for model_name, model in unit['models'].items())
+            self.templates[name] = UnitTemplate(unit_id, name, unit['movement'], unit['save'], unit['bravery'],
+                                                unit['wounds'], models, tuple(unit.get('unit_types', ())),
+                                                tuple(unit.get('keywords', ())))
+        return self.templates
+
+    def clear(self):
+        self.templates = None
+
+    def get_unit_template(self, unit_name):
+        templates = self.templates if self.templates is not None else self.load()
+        try:
+            return templates[unit_name]
+        except KeyError:
+            raise NoSuchUnitException(unit_name)
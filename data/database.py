@@ -1,37 +1,141 @@
 import os
 import sqlite3
+import threading
+from functools import lru_cache
+from urllib.request import pathname2url
 
 from dice import DiceRoller
 
 DB_NAME = '%s%s%s' % (os.path.dirname(os.path.abspath(__file__)), os.path.sep, 'units.db')
-
-conn = sqlite3.connect(DB_NAME)
-cursor = conn.cursor()
+CORE_SCHEMA = '%s%s%s' % (os.path.dirname(os.path.abspath(__file__)), os.path.sep, 'schema.sql')
+
+MEMORY_DB = ':memory:'
+
+
+class ConnectionManager:
+    """ Gives every thread its own read-only connection to the database, plus one shared writer connection
+
+    sqlite3 connections cannot be used by two threads at once, so lookups go through reader(), which opens a
+    connection the first time a thread asks for one and reuses it (and its prepared statement cache)
+    afterwards. Connections are pooled by thread id, so a new thread that reuses a finished thread's id picks
+    up its connection. File databases use WAL so readers are not blocked while schemas are loaded; an
+    in-memory database is opened in shared cache mode so that every thread sees the same data.
+
+    The writer is only opened once something is written, so a file database that is only read can be read-only.
+    """
+
+    def __init__(self, db_name=DB_NAME):
+        self.in_memory = db_name == MEMORY_DB
+        if self.in_memory:
+            self.uri = 'file:units-%d?mode=memory&cache=shared' % id(self)
+            self.reader_uri = self.uri
+        else:
+            self.uri = 'file:%s' % pathname2url(os.path.abspath(db_name))
+            self.reader_uri = '%s?mode=ro' % self.uri
+        self.write_lock = threading.Lock()
+        self.readers = {}
+        self.writer_connection = None
+        if self.in_memory:
+            # The writer keeps the memory database alive, so it has to be opened before any reader
+            self.writer()
+
+    def writer(self):
+        with self.write_lock:
+            if self.writer_connection is None:
+                # Opening the writer creates the database file if there is none yet
+                self.writer_connection = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+                if not self.in_memory:
+                    self.writer_connection.execute('PRAGMA journal_mode=WAL')
+            return self.writer_connection
+
+    def reader(self):
+        thread_id = threading.get_ident()
+        connection = self.readers.get(thread_id)
+        if connection is None:
+            connection = sqlite3.connect(self.reader_uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA query_only=ON')
+            self.readers[thread_id] = connection
+        return connection
+
+    def executescript(self, script):
+        writer = self.writer()
+        with self.write_lock:
+            writer.executescript(script)
+            writer.commit()
+
+    def close(self):
+        for connection in self.readers.values():
+            connection.close()
+        self.readers.clear()
+        if self.writer_connection is not None:
+            self.writer_connection.close()
+            self.writer_connection = None
+
+
+STATEMENT_CACHE_SIZE = 256
+
+db_name = DB_NAME  # Database the connection manager is opened on, see connect
+connections = None  # The ConnectionManager, opened on first use by get_connections
+connections_lock = threading.Lock()
+
+reload_listeners = []  # Callbacks run after initialize_db reloads the schema files
+
+
+def add_reload_listener(fn):
+    reload_listeners.append(fn)
+
+
+def get_connections():
+    """ The ConnectionManager for the current database, opened the first time it is needed
+
+    Nothing touches SQLite until then, so processes that build units from another catalog never open it.
+    """
+    global connections
+    with connections_lock:
+        if connections is None:
+            connections = ConnectionManager(db_name)
+        return connections
+
+
+def connect(name=DB_NAME):
+    """ Switch to another database, e.g. ':memory:' for a throwaway catalog built with initialize_db """
+    global db_name
+    close()
+    db_name = name
+    for listener in reload_listeners:
+        listener()
 
 
 def initialize_db():
     abspath = os.path.abspath('%s%s%s' % (os.path.dirname(os.path.abspath(__file__)), os.path.sep, '..'))
     files = ['%s%s%s' % (path, os.path.sep, file) for path, dirs, files, fd in os.fwalk(abspath) for file in files]
-    schema_files = [_ for _ in filter(lambda file: '.sql' in file, files)]
+    # The core schema creates the tables, so it has to run before the unit schemas
+    schema_files = sorted(filter(lambda file: '.sql' in file, files), key=lambda file: (file != CORE_SCHEMA, file))
     for schema in schema_files:
         read_schema(schema)
+    for listener in reload_listeners:
+        listener()
 
 
 def read_schema(schema_file):
     with open(schema_file, 'rb+') as schema:
-        conn.executescript(schema.read().decode('utf-8'))
+        get_connections().executescript(schema.read().decode('utf-8'))
+
+
+@lru_cache(maxsize=None)
+def select_sql(table, field, order_by=None):
+    # Identical SQL text lets sqlite3 reuse each connection's prepared statements
+    sql = "SELECT * FROM %s WHERE %s=?" % (table, field)
+    return sql if order_by is None else "%s ORDER BY %s" % (sql, order_by)
 
 
 def fetch_one(table, value, field='id', order_by='id'):
-    sql = "SELECT * FROM %s WHERE %s=? ORDER BY %s" % (table, field, order_by)
-    cursor.execute(sql, (value,))
-    return cursor.fetchone()
+    return get_connections().reader().execute(select_sql(table, field, order_by), (value,)).fetchone()
 
 
 def fetch_all(table, value, field='id'):
-    sql = "SELECT * FROM %s WHERE %s=?" % (table, field)
-    cursor.execute(sql, (value,))
-    return cursor.fetchall()
+    return get_connections().reader().execute(select_sql(table, field), (value,)).fetchall()
 
 
 def get_unit_by_name(unit_name):
@@ -50,18 +154,15 @@ def get_weapon_profile_by_id(profile_id):
     _, _, weapon_name, weapon_range, attacks, to_hit, to_wound, rend, damage = \
         fetch_one(table='weapon_profiles', value=profile_id)
 
-    # Convert damage and attacks to integers or callbacks (random values e.g. d3 damage)
-    try:
-        damage = int(damage)
-    except ValueError:
-        damage = getattr(DiceRoller, damage)
+    return weapon_name, weapon_range, to_profile_value(attacks), to_hit, to_wound, rend, to_profile_value(damage)
 
+
+def to_profile_value(value):
+    # Convert damage and attacks to integers or callbacks (random values e.g. d3 damage)
     try:
-        attacks = int(attacks)
+        return int(value)
     except ValueError:
-        attacks = getattr(DiceRoller, attacks)
-
-    return weapon_name, weapon_range, attacks, to_hit, to_wound, rend, damage
+        return getattr(DiceRoller, value)
 
 
 def get_unit_types_by_unit_id(unit_id):
@@ -75,8 +176,12 @@ def get_keywords_by_unit_id(unit_id):
 
 
 def close():
-    cursor.close()
-    conn.close()
+    """ Close every connection; the next lookup opens the current database again """
+    global connections
+    with connections_lock:
+        if connections is not None:
+            connections.close()
+            connections = None
 
 # Run this file to reinitialize the database
 if __name__ == '__main__':
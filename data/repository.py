@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+from data import database
+from weapons import WeaponProfile
+
+# Immutable unit templates, shared by every Unit instance built from the catalog
+UnitTemplate = namedtuple('UnitTemplate', ['id', 'name', 'movement', 'save', 'bravery', 'wounds', 'models',
+                                           'unit_types', 'keywords'])
+ModelTemplate = namedtuple('ModelTemplate', ['id', 'name', 'type', 'weapons'])
+
+MODELS_SQL = """
+SELECT models.unit_id, models.id, models.name, models.type, weapon_profiles.name, weapon_profiles.range,
+       weapon_profiles.attacks, weapon_profiles.to_hit, weapon_profiles.to_wound, weapon_profiles.rend,
+       weapon_profiles.damage
+FROM models
+LEFT JOIN models_weapon_profiles ON models_weapon_profiles.model_id = models.id
+LEFT JOIN weapon_profiles ON weapon_profiles.id = models_weapon_profiles.weapon_profile_id
+ORDER BY models.id, models_weapon_profiles.id
+"""
+
+UNIT_TYPES_SQL = """
+SELECT units_unit_types.unit_id, unit_types.name
+FROM units_unit_types JOIN unit_types ON unit_types.id = units_unit_types.unit_type_id
+ORDER BY units_unit_types.id
+"""
+
+KEYWORDS_SQL = """
+SELECT units_keywords.unit_id, keywords.keyword
+FROM units_keywords JOIN keywords ON keywords.id = units_keywords.keyword_id
+ORDER BY units_keywords.id
+"""
+
+
+class UnitRepository:
+    """ Loads the whole unit catalog in a handful of JOIN queries and hands out immutable UnitTemplates
+
+    The catalog is read on first use and kept in memory, so building units never touches SQLite again
+    until the repository is cleared.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        self.templates = None
+
+    def load(self):
+        connection = self.connection or database.get_connections().reader()
+        models = {}
+        for unit_id, model_id, model_name, model_type, *weapon in connection.execute(MODELS_SQL):
+            if model_id not in models:
+                models[model_id] = (unit_id, model_name, model_type, [])
+            if weapon[0] is not None:
+                name, weapon_range, attacks, to_hit, to_wound, rend, damage = weapon
+                models[model_id][3].append(WeaponProfile(name, weapon_range, database.to_profile_value(attacks),
+                                                         to_hit, to_wound, rend, database.to_profile_value(damage)))
+        unit_models = {}
+        for model_id, (unit_id, model_name, model_type, weapons) in models.items():
+            unit_models.setdefault(unit_id, []).append(ModelTemplate(model_id, model_name, model_type, tuple(weapons)))
+
+        unit_types, keywords = {}, {}
+        for unit_id, unit_type in connection.execute(UNIT_TYPES_SQL):
+            unit_types.setdefault(unit_id, []).append(unit_type)
+        for unit_id, keyword in connection.execute(KEYWORDS_SQL):
+            keywords.setdefault(unit_id, []).append(keyword)
+
+        self.templates = {
+            name: UnitTemplate(unit_id, name, movement, save, bravery, wounds, tuple(unit_models.get(unit_id, ())),
+                               tuple(unit_types.get(unit_id, ())), tuple(keywords.get(unit_id, ())))
+            for unit_id, name, movement, save, bravery, wounds in connection.execute("SELECT * FROM units ORDER BY id")
+        }
+        return self.templates
+
+    def clear(self):
+        self.templates = None
+
+    def get_unit_template(self, unit_name):
+        templates = self.templates if self.templates is not None else self.load()
+        try:
+            return templates[unit_name]
+        except KeyError:
+            raise NoSuchUnitException(unit_name)
+
+
+repository = UnitRepository()
+database.add_reload_listener(repository.clear)
+
+catalog = repository  # Where units are built from, see use_catalog
+
+
+def use_catalog(unit_catalog):
+    """ Build units from another catalog with a get_unit_template method, e.g. catalog.JsonCatalog """
+    global catalog
+    catalog = unit_catalog
+
+
+def get_unit_template(unit_name):
+    return catalog.get_unit_template(unit_name)
+
+
+# Custom exception classes
+class NoSuchUnitException(Exception):
+    pass
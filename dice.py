@@ -1,22 +1,162 @@
+import threading
 from enum import Enum
-from random import randint
+
+import numpy as np
+
+BUFFER_SIZE = 4096  # Dice of each type generated at a time
 
 
 class Dice(Enum):
     D6 = "d6"
     D3 = "d3"
 
+    # Members are singletons, so hash them by identity rather than through Enum's hash of the name
+    __hash__ = object.__hash__
+
+    @property
+    def sides(self):
+        return int(self.value[1:])
+
+
+def as_dice(value):
+    """ Convert a fixed or random profile value (e.g. DiceRoller.d3) into an int or a Dice member """
+    return value if isinstance(value, int) else Dice(value.__name__)
+
+
+class DiceStream:
+    """ A block of pre-rolled dice of one type, served in order
+
+    Alongside the rolls it keeps running totals and running counts of the rolls of at least each value, so the
+    total or the number of successes of any run of dice is a subtraction rather than a loop.
+    """
+
+    def __init__(self, rolls, sides):
+        self.rolls = rolls.tolist()
+        self.totals = np.concatenate(([0], np.cumsum(rolls))).tolist()
+        self.at_least = {needed: np.concatenate(([0], np.cumsum(rolls >= needed))).tolist()
+                         for needed in range(2, sides + 1)}
+        self.position = 0
+        self.size = len(self.rolls)
+
+
+def count_at_least(stream, start, number_of_dice, needed):
+    at_least = stream.at_least.get(needed)
+    if at_least is None:
+        return number_of_dice if needed <= 1 else 0
+    return at_least[start + number_of_dice] - at_least[start]
+
+
+class DiceBuffer:
+    """ Dice generated in bulk from a seeded numpy Generator and handed out one at a time or in counts
+
+    Every method consumes dice from the same streams in the same order whether it returns the rolls themselves,
+    their total or the number of successes, so a seeded simulation gives the same results either way.
+    """
+
+    def __init__(self, seed=None, size=BUFFER_SIZE):
+        self.size = size
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.streams = {}
+
+    def take(self, dice_type, number_of_dice):
+        """ Consume the next number_of_dice dice of dice_type, refilling their stream first if too few are left
+
+        :returns: the stream and the position of the first die taken
+        """
+        stream = self.streams.get(dice_type)
+        if stream is None or stream.position + number_of_dice > stream.size:
+            rolls = self.rng.integers(1, dice_type.sides + 1, size=max(self.size, number_of_dice), dtype=np.int64)
+            stream = self.streams[dice_type] = DiceStream(rolls, dice_type.sides)
+        start = stream.position
+        stream.position = start + number_of_dice
+        return stream, start
+
+    def roll(self, number_of_dice, dice_type=Dice.D6, modifier=0):
+        stream, start = self.take(dice_type, number_of_dice)
+        rolls = stream.rolls[start:start + number_of_dice]
+        return [roll + modifier for roll in rolls] if modifier else rolls
+
+    def d3(self):
+        stream, start = self.take(Dice.D3, 1)
+        return stream.rolls[start]
+
+    def d6(self):
+        stream, start = self.take(Dice.D6, 1)
+        return stream.rolls[start]
+
+    def total(self, number_of_dice, dice_type=Dice.D6):
+        stream, start = self.take(dice_type, number_of_dice)
+        return stream.totals[start + number_of_dice] - stream.totals[start]
+
+    def successes(self, number_of_dice, needed, dice_type=Dice.D6, reroll_below=1):
+        """ Roll number_of_dice dice and count those that rolled at least `needed`
+
+        Dice that rolled less than reroll_below (see tables.reroll_below) are rolled again, after all the others.
+        """
+        stream, start = self.take(dice_type, number_of_dice)
+        successes = count_at_least(stream, start, number_of_dice, needed)
+        rerolled = number_of_dice - count_at_least(stream, start, number_of_dice, reroll_below)
+        return successes + self.successes(rerolled, needed, dice_type) if rerolled else successes
+
+    def snapshot(self):
+        """ The buffer's state, for restore to roll the same dice again """
+        return (self.rng.bit_generator.state,
+                {dice_type: (stream, stream.position) for dice_type, stream in self.streams.items()})
+
+    def restore(self, snapshot):
+        state, streams = snapshot
+        self.rng.bit_generator.state = state
+        self.streams = {}
+        for dice_type, (stream, position) in streams.items():
+            stream.position = position
+            self.streams[dice_type] = stream
+
+
+class ThreadBuffers(threading.local):
+    """ A separate DiceBuffer for every thread, as a DiceBuffer's streams cannot be shared between threads """
+
+    def __init__(self):
+        self.buffer = DiceBuffer()
+
+
+thread_buffers = ThreadBuffers()  # Source of every die DiceRoller rolls
+
+
+def dice_buffer():
+    """ The calling thread's DiceBuffer """
+    return thread_buffers.buffer
+
+
+def seed(value=None):
+    """ Seed the dice rolled by DiceRoller, and so by the scalar simulation in stats.py, in the calling thread
+
+    Each thread rolls from its own buffer, which starts unseeded, so a thread running a simulation that should
+    be reproducible seeds its own dice before it starts.
+    """
+    dice_buffer().seed(value)
+
 
 class DiceRoller:
 
     @staticmethod
     def roll(number_of_dice, dice_type=Dice.D6, modifier=0):
-        return [getattr(DiceRoller, dice_type.value)() + modifier for _ in range(number_of_dice)]
+        return dice_buffer().roll(number_of_dice, dice_type, modifier)
 
     @staticmethod
     def d3():
-        return randint(1, 3)
+        return dice_buffer().d3()
 
     @staticmethod
     def d6():
-        return randint(1, 6)
+        return dice_buffer().d6()
+
+    @staticmethod
+    def total(number_of_dice, dice_type=Dice.D6):
+        return dice_buffer().total(number_of_dice, dice_type)
+
+    @staticmethod
+    def successes(number_of_dice, needed, dice_type=Dice.D6, reroll_below=1):
+        return dice_buffer().successes(number_of_dice, needed, dice_type, reroll_below)
@@ -0,0 +1,161 @@
+from functools import lru_cache
+
+import numpy as np
+
+import tables
+from dice import Dice, as_dice
+
+
+def to_percentage(die_roll):
+    return tables.success_chance(die_roll)
+
+
+@lru_cache(maxsize=None)
+def value_pmf(value):
+    """ Probability mass function of a fixed or dice value, indexed by the value rolled
+
+    :type value: int | dice.Dice
+    :rtype: numpy.ndarray
+    """
+    if isinstance(value, int):
+        pmf = np.zeros(value + 1)
+        pmf[value] = 1
+    else:
+        pmf = np.full(value.sides + 1, 1 / value.sides)
+        pmf[0] = 0
+    pmf.flags.writeable = False
+    return pmf
+
+
+def convolve_power(pmf, n):
+    """ Distribution of the sum of n independent draws from pmf """
+    result = np.ones(1)
+    while n:
+        if n & 1:
+            result = np.convolve(result, pmf)
+        n >>= 1
+        if n:
+            pmf = np.convolve(pmf, pmf)
+    return result
+
+
+class DamageDistribution:
+    """ Exact distribution of the wounds dealt by an attack, pmf[n] being the chance of dealing n wounds """
+
+    def __init__(self, pmf):
+        self.pmf = pmf
+        self.cdf = np.cumsum(pmf)
+
+    def mean(self):
+        return float(np.dot(np.arange(len(self.pmf)), self.pmf))
+
+    def variance(self):
+        values = np.arange(len(self.pmf))
+        return float(np.dot(values * values, self.pmf)) - self.mean() ** 2
+
+    def percentile(self, q):
+        """ Smallest number of wounds dealt in at least q percent of attacks """
+        return int(min(np.searchsorted(self.cdf, q / 100 - 1e-12), len(self.pmf) - 1))
+
+    def chance_of_at_least(self, wounds):
+        if wounds <= 0:
+            return 1.0
+        if wounds >= len(self.pmf):
+            return 0.0
+        return float(1 - self.cdf[wounds - 1])
+
+    def chance_to_slay(self, models, wounds):
+        """ Chance of slaying at least `models` models with `wounds` wounds each from a fresh unit """
+        return self.chance_of_at_least(models * wounds)
+
+
+def damage_distribution(attacks, hits_on, wounds_on, rend, damage, target_save, count=1, extra_attacks=0,
+                        hit_rerolls=tables.Rerolls.NONE, wound_rerolls=tables.Rerolls.NONE, bonus_attacks=0):
+    """ Build the exact damage distribution of count models attacking with a weapon
+
+    Random attacks are rolled once and multiplied by the number of models, as in stats.simulate_attack.
+    bonus_attacks are added to each model's attacks and extra_attacks to the total, which is never below 0.
+
+    :param attacks: number of attacks per model, or a DiceRoller callable for random attacks
+    :param damage: damage per unsaved wound, or a DiceRoller callable for random damage
+    :rtype: DamageDistribution
+    """
+    chance = tables.damaging_hit_chance(hits_on, wounds_on, rend, target_save, hit_rerolls, wound_rerolls)
+    # A single attack deals nothing with probability 1 - chance, otherwise it deals the damage roll
+    attack_pmf = value_pmf(as_dice(damage)) * chance
+    attack_pmf[0] += 1 - chance
+
+    attacks_pmf = value_pmf(as_dice(attacks))
+    pmf = np.zeros(1)
+    for attacks_rolled in np.flatnonzero(attacks_pmf):
+        total_attacks = total_attacks_made(count, int(attacks_rolled), bonus_attacks, extra_attacks)
+        total = convolve_power(attack_pmf, total_attacks) * attacks_pmf[attacks_rolled]
+        if len(total) > len(pmf):
+            pmf = np.pad(pmf, (0, len(total) - len(pmf)))
+        pmf[:len(total)] += total
+    return DamageDistribution(pmf)
+
+
+def weapon_damage_distribution(weapon_profile, target_save, count=1):
+    """ Damage distribution of count models attacking with a ResolvedProfile (see Unit.resolve) """
+    return damage_distribution(weapon_profile.attacks, weapon_profile.to_hit, weapon_profile.to_wound,
+                               weapon_profile.rend, weapon_profile.damage, target_save, count,
+                               weapon_profile.extra_attacks, weapon_profile.hit_rerolls, weapon_profile.wound_rerolls,
+                               weapon_profile.bonus_attacks)
+
+
+def total_attacks_made(count, attacks, bonus_attacks=0, extra_attacks=0):
+    """ Attacks made by count models with a weapon, which modifiers can reduce to nothing but not below """
+    return max(count * (attacks + bonus_attacks) + extra_attacks, 0)
+
+
+@lru_cache(maxsize=None)
+def dice_sum_pmf(dice, number=1, modifier=0):
+    """ Probability mass function of the sum of `number` dice plus a non-negative modifier, indexed by total
+
+    :type dice: dice.Dice
+    :rtype: numpy.ndarray
+    """
+    pmf = np.concatenate((np.zeros(modifier), convolve_power(value_pmf(dice), number)))
+    pmf.flags.writeable = False
+    return pmf
+
+
+@lru_cache(maxsize=None)
+def at_least_chances(dice, number=1):
+    """ Chance of the sum of `number` dice being at least n, indexed by n
+
+    :rtype: numpy.ndarray
+    """
+    pmf = dice_sum_pmf(dice, number)
+    chances = np.append(pmf[::-1].cumsum()[::-1], 0.0)
+    chances.flags.writeable = False
+    return chances
+
+
+CHARGE_DICE = 2  # Number of D6 rolled for a charge
+
+
+def charge_chance(distance):
+    """ Chance of a charge roll (2D6) reaching a unit `distance` inches away, as in stats.play_round """
+    chances = at_least_chances(Dice.D6, CHARGE_DICE)
+    return float(chances[min(max(distance, 0), len(chances) - 1)])
+
+
+@lru_cache(maxsize=None)
+def flee_pmf(models_lost, bravery, models_remaining):
+    """ Distribution of the number of models fleeing a battleshock test, as in stats.battleshock
+
+    The test is models_lost + D6, and is only taken when the unit lost any wounds; for every point it beats
+    bravery by, another model flees.
+
+    :rtype: numpy.ndarray indexed by the number of models fleeing, up to models_remaining
+    """
+    pmf = np.zeros(models_remaining + 1)
+    if models_lost <= 0:
+        pmf[0] = 1
+    else:
+        for test, chance in enumerate(dice_sum_pmf(Dice.D6, 1, models_lost)):
+            pmf[min(max(test - bravery, 0), models_remaining)] += chance
+    pmf.flags.writeable = False
+    return pmf
@@ -0,0 +1,125 @@
+import sys
+from collections import namedtuple
+from enum import Enum
+
+
+class Phases(Enum):
+    SHOOTING = "Shooting"
+    CHARGE = "Charge"
+    COMBAT = "Combat"
+    BATTLESHOCK = "Battleshock"
+
+
+class Steps(Enum):
+    HIT = "hit"
+    WOUND = "wound"
+    SAVE = "save"
+
+
+# Simulation events, emitted to a sink in the order they happen
+DiceRolled = namedtuple('DiceRolled', ['step', 'rolls', 'needed'])
+AttackResolved = namedtuple('AttackResolved', ['unit', 'weapon', 'wounds'])
+PhaseStarted = namedtuple('PhaseStarted', ['phase', 'unit'])
+ChargeRolled = namedtuple('ChargeRolled', ['unit', 'roll', 'succeeded'])
+ModelsFled = namedtuple('ModelsFled', ['unit', 'models'])
+UnitSlain = namedtuple('UnitSlain', ['unit'])
+RoundEnded = namedtuple('RoundEnded', [])
+BattleDrawn = namedtuple('BattleDrawn', ['rounds'])
+SimulationStarted = namedtuple('SimulationStarted', ['number'])
+SimulationFinished = namedtuple('SimulationFinished',
+                                ['attacking_unit', 'defending_unit', 'simulations', 'distance',
+                                 'attacker_wins', 'defender_wins', 'draws'])
+
+
+class NullSink:
+    """ Discards every event
+
+    Callers check `enabled` before building an event, so a silent simulation never creates events or
+    formats strings.
+    """
+
+    enabled = False
+
+    def emit(self, event):
+        pass
+
+
+class CollectingSink:
+    """ Keeps every event in a list, for inspecting a battle after the fact """
+
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+class PrintSink:
+    """ Writes the human-readable battle transcript """
+
+    enabled = True
+
+    def __init__(self, file=None):
+        self.file = file or sys.stdout
+
+    def write(self, text):
+        print(text, file=self.file)
+
+    def emit(self, event):
+        getattr(self, 'on_%s' % type(event).__name__)(event)
+
+    def on_DiceRolled(self, event):
+        if event.step is Steps.SAVE:
+            self.write("Rolled %s, saves on %s+ (after rend)\n" % (event.rolls, event.needed))
+        else:
+            self.write("Rolled %s, needs %s to %s" % (event.rolls, event.needed, event.step.value))
+
+    def on_AttackResolved(self, event):
+        self.write("%s inflicts %d wounds with %s\n" % (event.unit.name, event.wounds, event.weapon.name))
+
+    def on_PhaseStarted(self, event):
+        if event.phase is Phases.SHOOTING:
+            self.write("%s's shooting phase:\n" % event.unit.name)
+        elif event.phase is Phases.COMBAT:
+            self.write("\n%s's combat phase:\n" % event.unit.name)
+        elif event.phase is Phases.BATTLESHOCK:
+            self.write("Battleshock phase:\n")
+
+    def on_ChargeRolled(self, event):
+        self.write("Charge roll: %d" % event.roll)
+        self.write("%s's charge %s!" % (event.unit.name, "succeeded" if event.succeeded else "failed"))
+
+    def on_ModelsFled(self, event):
+        self.write('%d %s models flee!\n' % (event.models, event.unit.name))
+
+    def on_UnitSlain(self, event):
+        self.write("%s was slain!" % event.unit.name)
+
+    def on_RoundEnded(self, event):
+        self.write("\n%s\n" % ("-" * 105))
+
+    def on_BattleDrawn(self, event):
+        self.write("Neither unit was slain after %d battle rounds, the battle is a draw." % event.rounds)
+
+    def on_SimulationStarted(self, event):
+        self.write("\n%s\n" % ("#" * 105))
+        self.write("SIMULATION %d" % event.number)
+        self.write("\n%s\n" % ("#" * 105))
+
+    def on_SimulationFinished(self, event):
+        attacking_unit, defending_unit = event.attacking_unit, event.defending_unit
+        self.write("\n%s\n" % ("#" * 105))
+        self.write("Simulated %d battles between %d %s and %d %s." %
+                   (event.simulations, attacking_unit.remaining_models(), attacking_unit.name,
+                    defending_unit.remaining_models(), defending_unit.name))
+        self.write("%s had the initiative at a distance of %d inches" % (attacking_unit.name, event.distance))
+        self.write("%s won %d times, %s won %d times." %
+                   (attacking_unit.name, event.attacker_wins, defending_unit.name, event.defender_wins))
+        if event.draws:
+            self.write("%d battles were drawn." % event.draws)
+        self.write("\n%s\n" % ("#" * 105))
+
+
+NULL_SINK = NullSink()
@@ -0,0 +1,189 @@
+""" Exact battle outcomes from a Markov chain over unit states
+
+A unit's state is its health: the wounds left on its current model plus the full wounds of every other model
+remaining. Casualties are always removed in the same order (see unit.removal_order) and fleeing models reset
+the current model's wounds, so health alone gives the models remaining in each slot and the wounds remaining.
+A battle state is the health of both units, the distance between them and the active side, which alternates
+every round as in stats.Battle. Each round is resolved phase by phase from the exact distributions in
+distributions.py, and the chain is then stepped for max_rounds rounds.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from cache import make_key, results_cache
+from distributions import charge_chance, flee_pmf, weapon_damage_distribution
+from stats import ATTACKER, DEFENDER, DRAW, MAX_ROUNDS
+from unit import removal_order
+from weapons import WeaponTypes
+
+EXPECTED_ROUNDS = 'expected_rounds'
+
+
+class ChainUnit:
+    """ Read-only snapshot of a unit's profile, with the damage it deals memoized by models remaining """
+
+    def __init__(self, unit, target):
+        self.name = unit.name
+        self.movement = unit.movement
+        self.save = unit.save
+        self.bravery = unit.bravery
+        self.wounds = unit.wounds
+        models = list(unit.model_counts)
+        self.counts = [unit.model_counts[model] for model in models]
+        profiles = unit.resolve_against(target)
+        self.weapons = [(slot, profiles[weapon]) for slot, model in enumerate(models) for weapon in model.weapons]
+        self.removal_order = [models.index(model) for model in removal_order(models)]
+        self.health = sum(self.counts) * self.wounds
+        self.damage_pmfs = {}
+
+    def models_left(self, health):
+        return max(-(-health // self.wounds), 0)
+
+    def slot_counts(self, models_left):
+        counts = list(self.counts)
+        models_slain = sum(counts) - models_left
+        for slot in self.removal_order:
+            removed = min(counts[slot], models_slain)
+            counts[slot] -= removed
+            models_slain -= removed
+        return counts
+
+    def damage_pmf(self, health, distance, target_save, weapon_type=WeaponTypes.COMBAT):
+        """ Distribution of the wounds this unit deals, as in stats.simulate_attack, when left with `health` """
+        key = self.models_left(health), distance, target_save, weapon_type
+        if key not in self.damage_pmfs:
+            counts = self.slot_counts(key[0])
+            pmf = np.ones(1)
+            for slot, weapon in self.weapons:
+                if counts[slot] > 0 and weapon.weapon_type == weapon_type and weapon.weapon_range >= distance:
+                    pmf = np.convolve(pmf, weapon_damage_distribution(weapon, target_save, counts[slot]).pmf)
+            self.damage_pmfs[key] = pmf
+        return self.damage_pmfs[key]
+
+
+def attack(units, states, outcomes, striker, weapon_type=WeaponTypes.COMBAT):
+    """ Resolve an attack by units[striker] from each (health, health, distance) state
+
+    Distances of 3 or more are skipped for combat attacks. Slain targets add to the striker's entry in outcomes.
+    """
+    target = 1 - striker
+    result = defaultdict(float)
+    for state, chance in states.items():
+        health, distance = list(state[:2]), state[2]
+        if weapon_type == WeaponTypes.COMBAT and distance >= 3:
+            result[state] += chance
+            continue
+        pmf = units[striker].damage_pmf(health[striker], distance, units[target].save, weapon_type)
+        outcomes[striker] += chance * float(pmf[health[target]:].sum())
+        for wounds in np.flatnonzero(pmf[:health[target]]):
+            after = list(health)
+            after[target] -= int(wounds)
+            result[after[0], after[1], distance] += chance * pmf[wounds]
+    return result
+
+
+def battleshock(units, states, outcomes, side, health_at_start):
+    """ Take a battleshock test for units[side] from each state, with the wounds it lost this round """
+    unit = units[side]
+    result = defaultdict(float)
+    for state, chance in states.items():
+        health = list(state[:2])
+        models = unit.models_left(health[side])
+        pmf = flee_pmf(health_at_start - health[side], unit.bravery, models)
+        result[state] += chance * pmf[0]
+        outcomes[1 - side] += chance * pmf[models]
+        for fleeing in range(1, models):
+            health[side] = (models - fleeing) * unit.wounds
+            result[health[0], health[1], state[2]] += chance * pmf[fleeing]
+    return result
+
+
+def play_round(units, state):
+    """ Outcomes of one battle round from a (health, health, distance, active side) state
+
+    :returns: dict mapping the next state, or the index of the winning side, to its probability
+    """
+    *health, distance, active = state
+    defending = 1 - active
+    if distance > 3:
+        distance = max(distance - units[active].movement, 3)
+
+    outcomes = defaultdict(float)
+    states = attack(units, {(health[0], health[1], distance): 1.0}, outcomes, active, WeaponTypes.SHOOTING)
+
+    if 3 <= distance <= 12:
+        chance = charge_chance(distance)
+        charged = defaultdict(float)
+        for (*after, _), p in states.items():
+            charged[after[0], after[1], 0] += p * chance
+            charged[after[0], after[1], distance] += p * (1 - chance)
+        states = charged
+
+    states = attack(units, states, outcomes, active)
+    states = attack(units, states, outcomes, defending)
+    states = battleshock(units, states, outcomes, defending, health[defending])
+    states = battleshock(units, states, outcomes, active, health[active])
+    for after, p in states.items():
+        outcomes[(*after, defending)] += p
+    return {outcome: p for outcome, p in outcomes.items() if p > 0}
+
+
+class MarkovBattle:
+    """ Exact solver for a battle between two units, starting from full strength like stats.run_simulation """
+
+    def __init__(self, attacking_unit, defending_unit, distance=10):
+        self.units = (ChainUnit(attacking_unit, defending_unit), ChainUnit(defending_unit, attacking_unit))
+        self.start = (self.units[0].health, self.units[1].health, distance, 0)
+        self.transitions = {}
+
+    def outcomes(self, state):
+        if state not in self.transitions:
+            self.transitions[state] = play_round(self.units, state)
+        return self.transitions[state]
+
+    def chain(self):
+        """ Enumerate every state reachable from the start
+
+        :returns: the number of states (0 and 1 being the absorbing states where that side has won), and the
+                  from, to and probability arrays of every transition
+        """
+        index = {0: 0, 1: 1, self.start: 2}
+        sources, targets, chances = [0, 1], [0, 1], [1.0, 1.0]
+        pending = [self.start]
+        while pending:
+            state = pending.pop()
+            for outcome, chance in self.outcomes(state).items():
+                if outcome not in index:
+                    index[outcome] = len(index)
+                    pending.append(outcome)
+                sources.append(index[state])
+                targets.append(index[outcome])
+                chances.append(chance)
+        return len(index), np.array(sources), np.array(targets), np.array(chances)
+
+    def solve(self, max_rounds=MAX_ROUNDS):
+        """ Exact chance of each result after at most max_rounds battle rounds, and the expected rounds played """
+        states, sources, targets, chances = self.chain()
+        distribution = np.zeros(states)
+        distribution[2] = 1.0
+        rounds = 0.0
+        for _ in range(max_rounds):
+            undecided = distribution[2:].sum()
+            if not undecided:
+                break
+            rounds += undecided
+            distribution = np.bincount(targets, weights=distribution[sources] * chances, minlength=states)
+        return {ATTACKER: float(distribution[0]), DEFENDER: float(distribution[1]),
+                DRAW: float(distribution[2:].sum()), EXPECTED_ROUNDS: float(rounds)}
+
+
+def solve_battle(attacking_unit, defending_unit, distance=10, max_rounds=MAX_ROUNDS):
+    """ Exact counterpart of stats.run_simulation: the chance of each result rather than a tally of trials
+
+    :returns: dict of the attacker, defender and draw probabilities and the expected number of rounds played
+    """
+    key = make_key('solve_battle', attacking_unit.fingerprint(attacking_unit.model_counts),
+                   defending_unit.fingerprint(defending_unit.model_counts), distance, max_rounds)
+    return results_cache.get_or_compute(
+        key, lambda: MarkovBattle(attacking_unit, defending_unit, distance).solve(max_rounds))
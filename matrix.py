@@ -0,0 +1,104 @@
+""" Average damage of every registered unit against every other, with and without each of its buffs
+
+The result is a numpy structured array with one row per attacker, target, buff and weapon, the same numbers
+stats.calculate_attacks_vs_targets prints. It can be written out with to_csv or to_parquet (needs pyarrow).
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from data import repository
+from distributions import weapon_damage_distribution
+from stats import UNITS
+
+MATRIX_DTYPE = np.dtype([('attacker', 'U64'), ('target', 'U64'), ('buff', 'U64'), ('weapon', 'U64'),
+                         ('weapon_type', 'U16'), ('weapon_range', np.int64), ('damage', np.float64)])
+
+NO_BUFF = ''  # Buff column for rows with only the unit's abilities applied
+
+
+def build_unit(name, model_counts=None):
+    """ Build a unit from the UNITS registry, with one of each model type unless model_counts says otherwise """
+    unit = UNITS[name]()
+    for model_name in unit.models:
+        count = 1 if model_counts is None else model_counts.get(model_name, 0)
+        if count:
+            unit.add_models(model_name, count)
+    return unit
+
+
+@lru_cache(maxsize=None)
+def average_damage(profile, target_save, count):
+    return weapon_damage_distribution(profile, target_save, count).mean()
+
+
+def attacker_rows(attacker_name, target_names, compositions=None):
+    """ Rows of the matrix for one attacking unit
+
+    Targets sharing a save and keywords resolve the attacker's profiles identically, so each such group is
+    worked out once and its rows repeated for every target in it.
+    """
+    compositions = compositions or {}
+    attacking_unit = build_unit(attacker_name, compositions.get(attacker_name))
+    groups = {}
+    for target_name in target_names:
+        target = build_unit(target_name, compositions.get(target_name))
+        groups.setdefault((target.save, tuple(sorted(target.keywords))), (target, []))[1].append(target_name)
+
+    rows = []
+    for target, names in groups.values():
+        for buff_name, buff in [(NO_BUFF, None), *attacking_unit.buffs.items()]:
+            attacking_unit.reset_buffs()
+            for ability in attacking_unit.abilities:
+                ability(target)
+            if buff:
+                buff(attacking_unit, target)
+            for model, count in attacking_unit.models_remaining.items():
+                if count <= 0:
+                    continue
+                for weapon in model.weapons:
+                    damage = average_damage(attacking_unit.resolve(weapon), target.save, count)
+                    rows.extend((attacker_name, name, buff_name, weapon.name, weapon.weapon_type.value,
+                                 weapon.weapon_range, damage) for name in names)
+    return rows
+
+
+def matchup_matrix(attackers=None, targets=None, compositions=None, workers=None, catalog=None):
+    """ Average damage of every attacker's weapons against every target, for no buff and each of its buffs
+
+    Attackers are split across a process pool, one task per attacking unit; pass workers=1 to stay in process.
+
+    :param attackers: unit names, every registered unit by default
+    :param targets: unit names, every registered unit by default
+    :param compositions: {unit name: {model name: count}} for units that should not have one of each model
+    :param catalog: unit catalog shipped to the workers, as in parallel.run_parallel_simulation
+    :rtype: numpy.ndarray of MATRIX_DTYPE
+    """
+    attackers = list(UNITS) if attackers is None else list(attackers)
+    targets = list(UNITS) if targets is None else list(targets)
+    if workers == 1:
+        chunks = [attacker_rows(attacker, targets, compositions) for attacker in attackers]
+    else:
+        initializer, initargs = (repository.use_catalog, (catalog,)) if catalog else (None, ())
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=initializer,
+                                 initargs=initargs) as executor:
+            chunks = list(executor.map(attacker_rows, attackers, [targets] * len(attackers),
+                                       [compositions] * len(attackers)))
+    return np.array([row for rows in chunks for row in rows], dtype=MATRIX_DTYPE)
+
+
+def to_csv(matrix, path):
+    with open(path, 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(matrix.dtype.names)
+        writer.writerows(row.tolist() for row in matrix)
+
+
+def to_parquet(matrix, path):
+    import pyarrow
+    import pyarrow.parquet
+
+    pyarrow.parquet.write_table(pyarrow.table({name: matrix[name] for name in matrix.dtype.names}), path)
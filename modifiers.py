@@ -0,0 +1,143 @@
+""" Declarative weapon modifiers for unit abilities and buffs
+
+A modifier is one line of the form
+
+    <characteristic> <+N | -N | = N | reroll ones | reroll failed> [for shooting | for combat] [vs KEYWORD|...]
+
+where the characteristic is attacks, to_hit, to_wound, rend or damage. "+1" and "-1" add to or subtract from
+the roll or characteristic as the rules word it ("to_hit +1" makes hitting easier), while "= N" replaces the
+characteristic outright; damage can also be set to a dice roll, e.g. "damage = D3". Hit and wound rolls of 1, or
+every failed roll, can be re-rolled. "for" limits the modifier to shooting or combat weapons, and "vs" to
+targets with any of the keywords listed. For example:
+
+    to_hit +1 vs HERO|MONSTER
+    rend = 3 for shooting
+    to_wound reroll ones
+
+Modifiers only depend on the target's keywords, so the profiles they resolve to are worked out once per
+keyword set (see ProfileTable) and batch engines can look them up instead of calling an ability per battle.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from dice import DiceRoller
+from tables import Rerolls
+from weapons import WeaponModifiers, WeaponTypes
+
+Modifier = namedtuple('Modifier', ['characteristic', 'operation', 'value', 'weapon_type', 'keywords'])
+
+MODIFIER_PATTERN = re.compile(r'^(?P<characteristic>attacks|to_hit|to_wound|rend|damage)\s+'
+                              r'(?P<operation>[-+=]|reroll)\s*(?P<value>\d+|D3|D6|ones|failed)'
+                              r'(?:\s+for\s+(?P<weapon_type>shooting|combat))?'
+                              r'(?:\s+vs\s+(?P<keywords>[\w |]+?))?\s*$', re.IGNORECASE)
+
+# Operations each characteristic supports
+OPERATIONS = {'attacks': ('+', '-'), 'to_hit': ('+', '-', '=', 'reroll'), 'to_wound': ('+', '-', '=', 'reroll'),
+              'rend': ('+', '-', '='), 'damage': ('=',)}
+
+
+@lru_cache(maxsize=None)
+def parse_modifier(text):
+    match = MODIFIER_PATTERN.match(text.strip())
+    if not match:
+        raise InvalidModifierException(text)
+    characteristic = match.group('characteristic').lower()
+    operation, value = match.group('operation').lower(), match.group('value').upper()
+    if (operation not in OPERATIONS[characteristic] or (value.startswith('D') and characteristic != 'damage')
+            or (operation == 'reroll') != (value in ('ONES', 'FAILED'))):
+        raise InvalidModifierException(text)
+    if operation == 'reroll':
+        value = Rerolls(value.lower())
+    elif value.startswith('D'):
+        value = getattr(DiceRoller, value.lower())
+    else:
+        value = -int(value) if operation == '-' else int(value)
+    weapon_type = match.group('weapon_type')
+    keywords = match.group('keywords')
+    return Modifier(characteristic, operation, value,
+                    weapon_type and WeaponTypes(weapon_type.capitalize()),
+                    frozenset(keyword.strip().upper() for keyword in keywords.split('|')) if keywords else None)
+
+
+def apply_modifier(modifier, profile, modifiers):
+    """ Apply a Modifier to the WeaponModifiers of one weapon profile """
+    characteristic, value = modifier.characteristic, modifier.value
+    if characteristic == 'attacks':
+        modifiers.bonus_attacks += value
+    elif modifier.operation == 'reroll':
+        setattr(modifiers, characteristic[3:] + '_rerolls', value)
+    elif characteristic == 'damage':
+        modifiers.damage = value
+    elif modifier.operation == '=':
+        # Bonuses are added to rend but taken off the roll needed to hit or wound
+        if characteristic == 'rend':
+            modifiers.bonus_rend = value - profile.rend
+        else:
+            setattr(modifiers, 'bonus_' + characteristic, getattr(profile, characteristic) - value)
+    else:
+        name = 'bonus_' + characteristic
+        setattr(modifiers, name, getattr(modifiers, name) + value)
+
+
+class ModifierRules:
+    """ A set of parsed modifiers
+
+    Can be added to a unit as a buff, being called with the unit and its target like any other buff.
+    """
+
+    def __init__(self, *rules):
+        self.modifiers = tuple(parse_modifier(rule) for rule in rules)
+
+    def __bool__(self):
+        return bool(self.modifiers)
+
+    def apply(self, weapon_modifiers, keywords):
+        """ Apply every modifier that holds against a target with these keywords
+
+        :param weapon_modifiers: dict of WeaponProfile to its WeaponModifiers, as in Unit.modifiers
+        """
+        for modifier in self.modifiers:
+            if modifier.keywords is not None and modifier.keywords.isdisjoint(keywords):
+                continue
+            for profile, modifiers in weapon_modifiers.items():
+                if modifier.weapon_type is None or profile.weapon_type == modifier.weapon_type:
+                    apply_modifier(modifier, profile, modifiers)
+
+    def __call__(self, unit, target):
+        self.apply(unit.modifiers, target.keywords)
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules):
+    return ModifierRules(*rules)
+
+
+class ProfileTable:
+    """ Weapon profiles resolved against each target keyword set, each set worked out the first time it is seen """
+
+    def __init__(self, weapon_profiles, rules):
+        self.weapon_profiles = weapon_profiles
+        self.rules = rules
+        self.profiles = {}
+
+    def resolve(self, keywords):
+        """ dict of each WeaponProfile to its ResolvedProfile against a target with these keywords """
+        keywords = frozenset(keywords)
+        if keywords not in self.profiles:
+            weapon_modifiers = {profile: WeaponModifiers() for profile in self.weapon_profiles}
+            self.rules.apply(weapon_modifiers, keywords)
+            self.profiles[keywords] = {profile: modifiers.resolve(profile)
+                                       for profile, modifiers in weapon_modifiers.items()}
+        return self.profiles[keywords]
+
+
+@lru_cache(maxsize=None)
+def profile_table(weapon_profiles, rules):
+    """ The ProfileTable for a unit's weapon profiles (a tuple) and its ModifierRules, shared by every instance """
+    return ProfileTable(weapon_profiles, rules)
+
+
+# Custom exception classes
+class InvalidModifierException(Exception):
+    pass
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from batch import BatchUnit, simulate_battles, tally
+from data import repository
+from stats import ATTACKER, DEFENDER, DRAW, MAX_ROUNDS, UNITS
+
+CHUNK_SIZE = 10000  # Battles per task; fixed so results do not depend on the number of workers
+
+
+def unit_spec(unit):
+    """ Picklable description of a unit that a worker can rebuild from the UNITS registry """
+    return unit.name, tuple((model.name, count) for model, count in unit.model_counts.items()), tuple(unit.keywords)
+
+
+@lru_cache(maxsize=None)
+def build_unit(spec):
+    name, model_counts, keywords = spec
+    unit = UNITS[name]()
+    for model_name, count in model_counts:
+        unit.add_models(model_name, count)
+    unit.keywords = list(keywords)
+    return unit
+
+
+@lru_cache(maxsize=None)
+def build_batch_unit(spec, target_spec):
+    """ BatchUnit for a unit, with its declarative abilities resolved against its target """
+    return BatchUnit(build_unit(spec), [build_unit(target_spec)])
+
+
+def simulate_chunk(attacker_spec, defender_spec, battles, distance, seed_sequence, max_rounds=MAX_ROUNDS):
+    winners = simulate_battles(np.random.default_rng(seed_sequence), build_batch_unit(attacker_spec, defender_spec),
+                               build_batch_unit(defender_spec, attacker_spec), battles, distance, max_rounds)
+    return tally(winners, {ATTACKER: 0, DEFENDER: 0, DRAW: 0})
+
+
+def run_parallel_simulation(attacking_unit, defending_unit, simulations_to_run=100, distance=10, seed=None,
+                            workers=None, chunk_size=CHUNK_SIZE, max_rounds=MAX_ROUNDS, catalog=None):
+    """ Run the batch engine across a process pool and merge the win tallies
+
+    Every chunk of battles gets its own stream spawned from the seed, so a given seed produces the same
+    results whatever the number of workers. The units passed in are only read, never mutated.
+
+    :param catalog: unit catalog shipped to the workers to build units from (e.g. a loaded JsonCatalog),
+                    instead of each worker reading the database
+    """
+    chunks = [min(chunk_size, simulations_to_run - start) for start in range(0, simulations_to_run, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    attacker_spec, defender_spec = unit_spec(attacking_unit), unit_spec(defending_unit)
+    results = {ATTACKER: 0, DEFENDER: 0, DRAW: 0}
+    initializer, initargs = (repository.use_catalog, (catalog,)) if catalog else (None, ())
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=initializer,
+                             initargs=initargs) as executor:
+        futures = [executor.submit(simulate_chunk, attacker_spec, defender_spec, battles, distance, seed_sequence,
+                                   max_rounds)
+                   for battles, seed_sequence in zip(chunks, seeds)]
+        for future in futures:
+            for outcome, count in future.result().items():
+                results[outcome] += count
+    return results
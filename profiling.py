@@ -0,0 +1,80 @@
+""" Optional timing of the simulation phases and counts of the dice each weapon rolls
+
+The simulation engines time their phases through the module-level `profiler`, which does nothing until
+use_profiler is given a Profiler. Like event sinks, callers check `enabled` first, so a simulation that is not
+being profiled never reads the clock.
+
+    profiler = Profiler()
+    use_profiler(profiler)
+    run_simulation(attacking_unit, defending_unit, 1000)
+    use_profiler(None)
+    profiler.results()              # or pstats.Stats(profiler).sort_stats('tottime').print_stats()
+"""
+import marshal
+import time
+
+RESET = 'Reset'  # Resetting the units between battles, timed alongside the events.Phases
+
+
+class NullProfiler:
+    enabled = False
+
+
+class Profiler:
+    """ Accumulates the calls and time spent in each phase, and the attack dice rolled by each weapon
+
+    Only one phase is timed at a time: starting a phase stops the one before it.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.calls = {}
+        self.times = {}
+        self.rolls = {}
+        self.phase = None
+        self.started = None
+        self.stats = {}
+
+    def start(self, phase):
+        now = time.perf_counter()
+        self.stop(now)
+        self.phase = phase
+        self.started = now
+
+    def stop(self, now=None):
+        if self.phase is not None:
+            elapsed = (now or time.perf_counter()) - self.started
+            self.calls[self.phase] = self.calls.get(self.phase, 0) + 1
+            self.times[self.phase] = self.times.get(self.phase, 0.0) + elapsed
+            self.phase = None
+
+    def count_rolls(self, weapon_name, dice):
+        self.rolls[weapon_name] = self.rolls.get(weapon_name, 0) + dice
+
+    def results(self):
+        """ The calls and total time in seconds of each phase, and the attack dice rolled by each weapon """
+        return {'phases': {phase: {'calls': self.calls[phase], 'time': self.times[phase]} for phase in self.calls},
+                'rolls': dict(self.rolls)}
+
+    def create_stats(self):
+        """ Fill `stats` in the form cProfile uses, so pstats.Stats(profiler) can sort and print the phases """
+        self.stats = {('simulation', 0, phase): (calls, calls, self.times[phase], self.times[phase], {})
+                      for phase, calls in self.calls.items()}
+
+    def dump_stats(self, path):
+        """ Write the phase timings to a file that pstats.Stats and profile viewers can load """
+        self.create_stats()
+        with open(path, 'wb') as output:
+            marshal.dump(self.stats, output)
+
+
+NULL_PROFILER = NullProfiler()
+
+profiler = NULL_PROFILER  # Profiler the simulation engines report to, see use_profiler
+
+
+def use_profiler(new_profiler):
+    """ Report simulation phases to new_profiler, or stop profiling if it is None """
+    global profiler
+    profiler = new_profiler or NULL_PROFILER
@@ -0,0 +1,66 @@
+""" Finds unit modules without importing them, so UNITS can import each one lazily on first lookup
+
+The UNIT_NAME -> module mapping is cached in units/manifest.json; delete the file, or call
+build_manifest(), to rebuild it after adding units.
+"""
+import ast
+import json
+import os
+
+import units
+from unit import UNITS
+
+MANIFEST_NAME = '%s%s%s' % (os.path.dirname(os.path.abspath(units.__file__)), os.path.sep, 'manifest.json')
+
+
+def find_unit_name(path):
+    """ Return the module-level UNIT_NAME assigned in the source file at path, if there is one """
+    with open(path, 'rb') as source:
+        tree = ast.parse(source.read(), path)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+                and any(isinstance(target, ast.Name) and target.id == 'UNIT_NAME' for target in node.targets)):
+            return node.value.value
+    return None
+
+
+def scan_units(package=units):
+    """ Map each UNIT_NAME in the package's modules, recursively, to the dotted name of its module """
+    root = os.path.dirname(os.path.abspath(package.__file__))
+    modules = {}
+    for path, dirs, files in os.walk(root):
+        dirs[:] = sorted(_ for _ in dirs if os.path.isfile(os.path.join(path, _, '__init__.py')))
+        package_name = '.'.join([package.__name__] + os.path.relpath(path, root).split(os.path.sep)).rstrip('.')
+        for file in sorted(files):
+            if file.endswith('.py') and file != '__init__.py':
+                unit_name = find_unit_name(os.path.join(path, file))
+                if unit_name is not None:
+                    modules[unit_name] = '%s.%s' % (package_name, file[:-3])
+    return modules
+
+
+def build_manifest(path=MANIFEST_NAME):
+    """ Scan for unit modules and cache the result in the manifest, if it can be written (e.g. not on a read-only
+    install)
+    """
+    modules = scan_units()
+    try:
+        with open(path, 'w') as manifest:
+            json.dump(modules, manifest, indent=2, sort_keys=True)
+    except OSError:
+        pass
+    return modules
+
+
+def load_manifest(path=MANIFEST_NAME):
+    try:
+        with open(path) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return build_manifest(path)
+
+
+def register_units(registry=UNITS, path=MANIFEST_NAME):
+    """ Make every unit in the manifest available from the registry without importing any unit modules """
+    registry.add_modules(load_manifest(path))
+    registry.finder = lambda: build_manifest(path)
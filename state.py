@@ -0,0 +1,77 @@
+""" Compact array-backed state for many battles between the same units
+
+Every battle's mutable state is one row of integers in a single contiguous block: the models remaining in
+each of the first unit's model slots, the wounds remaining on its current model, the same for every other unit,
+and finally the distances between the units. Snapshots and resets are a single buffer copy.
+"""
+import numpy as np
+
+
+class StateLayout:
+    """ Column offsets of each unit's model slots and wounds remaining, and of the distances, within a state row
+
+    :param units: the BatchUnits taking part, in side order
+    :param distances: number of distance columns; one for a battle between two units
+    """
+
+    def __init__(self, *units, distances=1):
+        self.models = []
+        self.wounds = []
+        offset = 0
+        for unit in units:
+            self.models.append(slice(offset, offset + len(unit.counts)))
+            self.wounds.append(offset + len(unit.counts))
+            offset += len(unit.counts) + 1
+        self.distances = slice(offset, offset + distances)
+        self.width = offset + distances
+        self.initial = np.zeros(self.width, dtype=np.int64)
+        for side, unit in enumerate(units):
+            self.initial[self.models[side]] = unit.counts
+            self.initial[self.wounds[side]] = unit.wounds
+
+
+class BattleStates:
+    """ The state of `battles` battles as an (battles, layout.width) integer array
+
+    models() and wounds() return views into the block, so updating them in place updates the state.
+    """
+
+    def __init__(self, layout, battles, distance=10):
+        self.layout = layout
+        self.initial = layout.initial.copy()
+        self.initial[layout.distances] = np.ravel(distance)
+        self.data = np.empty((battles, layout.width), dtype=np.int64)
+        self.reset()
+
+    def __len__(self):
+        return len(self.data)
+
+    def models(self, side):
+        return self.data[:, self.layout.models[side]]
+
+    def wounds(self, side):
+        return self.data[:, self.layout.wounds[side]]
+
+    @property
+    def distances(self):
+        return self.data[:, self.layout.distances.start]
+
+    @distances.setter
+    def distances(self, distances):
+        self.data[:, self.layout.distances.start] = distances
+
+    def all_distances(self):
+        return self.data[:, self.layout.distances]
+
+    def reset(self):
+        self.data[:] = self.initial
+
+    def snapshot(self):
+        return self.data.copy()
+
+    def restore(self, snapshot):
+        self.data = snapshot.copy()
+
+    def keep(self, live):
+        """ Drop every battle whose entry in the boolean array `live` is False """
+        self.data = self.data[live]
@@ -1,43 +1,43 @@
 import importlib
 import pkgutil
-import pyclbr
-from functools import reduce
+from collections import namedtuple
 
-import units
+import profiling
+import tables
+from cache import make_key, results_cache
 from unit import UNITS
-from dice import DiceRoller
+from dice import DiceRoller, as_dice
+from distributions import damage_distribution, to_percentage, total_attacks_made, weapon_damage_distribution
+from modifiers import ModifierRules
+from registry import register_units
+from events import (NULL_SINK, AttackResolved, BattleDrawn, ChargeRolled, DiceRolled, ModelsFled, PhaseStarted,
+                    Phases, PrintSink, RoundEnded, SimulationFinished, SimulationStarted, Steps, UnitSlain)
 from weapons import WeaponTypes
 
 
 def import_units(package):
     """ Import all submodules of a module, recursively, including subpackages
 
+    Unit subclasses add themselves to UNITS as their modules are imported. This is only needed to load
+    every unit up front, as UNITS imports each unit module the first time it is looked up.
+
     :param package: package (name or actual module)
     :type package: str | module
-    :rtype: dict[str, types.ModuleType]
     """
     if isinstance(package, str):
         package = importlib.import_module(package)
     for loader, name, is_pkg in pkgutil.walk_packages(path=package.__path__):
         full_name = package.__name__ + '.' + name
-        module = importlib.import_module(full_name)
-        cls = [_.name for _ in pyclbr.readmodule(full_name).values()]
-        if cls:
-            # add each unit class to a global units dict
-            UNITS[module.UNIT_NAME] = getattr(module, cls[0])
+        UNITS.register_module(importlib.import_module(full_name))
         if is_pkg:
             import_units(full_name)
 
-# import all units
-import_units(units)
-
-
-def to_percentage(die_roll):
-    return max(1, min(5, (6 - (die_roll - 1)))) / 6
+# make all units available, importing their modules on first use
+register_units()
 
 
 def chance_to_wound(hits_on, wounds_on):
-    return to_percentage(hits_on) * to_percentage(wounds_on)
+    return tables.success_chance(hits_on) * tables.success_chance(wounds_on)
 
 
 def average_wounding_hits(attacks, hits_on, wounds_on):
@@ -45,42 +45,56 @@ def average_wounding_hits(attacks, hits_on, wounds_on):
 
 
 def average_damaging_hits(attacks, hits_on, wounds_on, rend, target_save):
-    return (average_wounding_hits(attacks, hits_on, wounds_on) *
-            (1 - (0 if (target_save + rend) > 6 else to_percentage(target_save + rend))))
+    return attacks * tables.damaging_hit_chance(hits_on, wounds_on, rend, target_save)
 
 
 def calculate_damage(attacks, hits_on, wounds_on, rend, damage, target_save):
-    hits = average_damaging_hits(attacks, hits_on, wounds_on, rend, target_save)
-    return (hits * damage if isinstance(damage, int)
-            else reduce((lambda x, y: x + damage()), range(round(hits)), 0))
+    # Exact expected value, including for random damage
+    return damage_distribution(attacks, hits_on, wounds_on, rend, damage, target_save).mean()
+
+
+def average_results(attacking_unit, target, weapon_type):
+    """ Average damage of each of the unit's weapons of weapon_type against the target, as currently buffed
+
+    Results are memoized on the resolved profiles, so repeated matchups are served from the results cache.
+    """
+    def calculate():
+        results = []
+        for model, count in attacking_unit.models_remaining.items():
+            if count <= 0:
+                continue
+            for weapon in model.weapons:
+                if weapon.weapon_type == weapon_type:
+                    profile = attacking_unit.resolve(weapon)
+                    damage = weapon_damage_distribution(profile, target.save, count).mean()
+                    results.append((weapon.name, weapon.weapon_range, damage))
+        return results
+
+    key = make_key('average_results', attacking_unit.fingerprint(), target.save, sorted(target.keywords),
+                   weapon_type.value)
+    return results_cache.get_or_compute(key, calculate)
 
 
 def print_average_shooting_result(attacking_unit, target):
-    attacks = attacking_unit.shooting_attacks()
+    attacks = average_results(attacking_unit, target, WeaponTypes.SHOOTING)
     if attacks:
         print("\nShooting phase:")
-    for weapon, profile in attacks:
-        damage = calculate_damage(profile.count * profile.attacks + profile.extra_attacks,
-                                  profile.to_hit - profile.bonus_to_hit, profile.to_wound, profile.rend,
-                                  profile.damage, target.save)
-        print("%40s |%30s\" |%30.2f" % (weapon, profile.weapon_range, damage))
+    for weapon, weapon_range, damage in attacks:
+        print("%40s |%30s\" |%30.2f" % (weapon, weapon_range, damage))
 
 
 def print_average_combat_results(attacking_unit, target):
-    attacks = attacking_unit.combat_attacks()
+    attacks = average_results(attacking_unit, target, WeaponTypes.COMBAT)
     if attacks:
         print("\nCombat phase:")
-    for weapon, profile in attacks:
-        damage = calculate_damage(profile.count * profile.attacks + profile.extra_attacks,
-                                  profile.to_hit - profile.bonus_to_hit, profile.to_wound, profile.rend,
-                                  profile.damage, target.save)
-        print("%40s |%30s\" |%30.2f" % (weapon, profile.weapon_range, damage))
+    for weapon, weapon_range, damage in attacks:
+        print("%40s |%30s\" |%30.2f" % (weapon, weapon_range, damage))
 
 
 def calculate_attacks_vs_target(attacking_unit, target, buff=None):
     attacking_unit.reset_buffs()
     for ability in attacking_unit.abilities:
-        ability(attacking_unit, target)
+        ability(target)
     print("Attacks for %s against %s (%d+ save)" % (attacking_unit.name, target.name, target.save))
     if buff:
         print(" with %s" % buff[0])
@@ -99,158 +113,257 @@ def calculate_attacks_vs_targets(attacking_unit, targets):
     print("%s\n" % ("-" * 105))
 
 
-def simulate_damage(attacks, hits_on, wounds_on, rend, damage, target_save):
-    roll_to_hit = DiceRoller.roll(attacks)  # TODO: re-rolls
-    print("Rolled %s, needs %s to hit" % (roll_to_hit, hits_on))
-    roll_to_wound = DiceRoller.roll(len([_ for _ in filter(lambda x: x >= hits_on, roll_to_hit)]))
-    print("Rolled %s, needs %s to wound" % (roll_to_wound, wounds_on))
-    roll_to_save = DiceRoller.roll(len([_ for _ in filter(lambda x: x >= wounds_on, roll_to_wound)]))
-    print("Rolled %s, saves on %s+ (after rend)\n" % (roll_to_save, target_save + rend))
-    wounding_hits = len([_ for _ in filter(lambda x: x < target_save + rend, roll_to_save)])
+def reroll(rolls, reroll_below):
+    """ Roll every die that rolled less than reroll_below again, rolling them all at once as DiceBuffer does """
+    rerolls = iter(DiceRoller.roll(len([_ for _ in rolls if _ < reroll_below])))
+    return [next(rerolls) if _ < reroll_below else _ for _ in rolls]
+
+
+def simulate_damage(attacks, hits_on, wounds_on, rend, damage, target_save, sink=NULL_SINK,
+                    hit_rerolls=tables.Rerolls.NONE, wound_rerolls=tables.Rerolls.NONE):
+    hit_roll, wound_roll = tables.hit_roll(hits_on), tables.hit_roll(wounds_on)
+    hit_reroll = tables.reroll_below(hit_rerolls, hit_roll)
+    wound_reroll = tables.reroll_below(wound_rerolls, wound_roll)
+    save_roll = tables.save_roll(target_save, rend)
+    if sink.enabled:
+        roll_to_hit = reroll(DiceRoller.roll(attacks), hit_reroll)
+        roll_to_wound = reroll(DiceRoller.roll(len([_ for _ in filter(lambda x: x >= hit_roll, roll_to_hit)])),
+                               wound_reroll)
+        roll_to_save = DiceRoller.roll(len([_ for _ in filter(lambda x: x >= wound_roll, roll_to_wound)]))
+        sink.emit(DiceRolled(Steps.HIT, roll_to_hit, hits_on))
+        sink.emit(DiceRolled(Steps.WOUND, roll_to_wound, wounds_on))
+        sink.emit(DiceRolled(Steps.SAVE, roll_to_save, target_save + rend))
+        wounding_hits = len([_ for _ in filter(lambda x: x < save_roll, roll_to_save)])
+    else:
+        # Only the number of successes matters, which the dice buffer counts without building the rolls
+        wounds = DiceRoller.successes(DiceRoller.successes(attacks, hit_roll, reroll_below=hit_reroll), wound_roll,
+                                      reroll_below=wound_reroll)
+        wounding_hits = wounds - DiceRoller.successes(wounds, save_roll)
     return (wounding_hits * damage if isinstance(damage, int)
-            else reduce(lambda x, y: x + damage(), range(wounding_hits), 0))
+            else DiceRoller.total(wounding_hits, as_dice(damage)))
 
 
-def simulate_attack(attacking_unit, defending_unit, distance, weapon_type=WeaponTypes.COMBAT):
+def simulate_attack(attacking_unit, defending_unit, distance, weapon_type=WeaponTypes.COMBAT, sink=NULL_SINK):
+    profiles = attacking_unit.resolve_against(defending_unit)
     total_damage = 0
     for model, count in attacking_unit.models_remaining.items():
         if count <= 0:
             continue
         for weapon in model.weapons:
             if weapon.weapon_type == weapon_type and weapon.weapon_range >= distance:
-                attacks = weapon.attacks if type(weapon.attacks) is int else weapon.attacks()
-                damage = simulate_damage(count * attacks + weapon.extra_attacks,
-                                         weapon.to_hit - weapon.bonus_to_hit,
-                                         weapon.to_wound - weapon.bonus_to_wound,
-                                         weapon.rend, weapon.damage, defending_unit.save)
-                print("%s inflicts %d wounds with %s\n" % (attacking_unit.name, damage, weapon.name))
+                profile = profiles[weapon]
+                attacks = profile.attacks if type(profile.attacks) is int else profile.attacks()
+                attacks = total_attacks_made(count, attacks, profile.bonus_attacks, profile.extra_attacks)
+                if profiling.profiler.enabled:
+                    profiling.profiler.count_rolls(weapon.name, attacks)
+                damage = simulate_damage(attacks, profile.to_hit, profile.to_wound, profile.rend, profile.damage,
+                                         defending_unit.save, sink, profile.hit_rerolls, profile.wound_rerolls)
+                if sink.enabled:
+                    sink.emit(AttackResolved(attacking_unit, weapon, damage))
                 total_damage += damage
     return total_damage
 
 
-def battleshock(unit, models_lost):
+def battleshock(unit, models_lost, sink=NULL_SINK):
     battleshock_test = models_lost + DiceRoller.d6()
     if unit.bravery < battleshock_test:
         fleeing_units = min(battleshock_test - unit.bravery, unit.remaining_models())
-        print('%d %s models flee!\n' % (fleeing_units, unit.name))
+        if sink.enabled:
+            sink.emit(ModelsFled(unit, fleeing_units))
         unit.flee(fleeing_units)
 
 
-# TODO: add flag to remove output (switch to logging?)
-def simulate_combat(attacking_unit, defending_unit, distance=3):
-    # returns the victorious unit object
+def slain(unit, sink):
+    if unit.remaining_models() <= 0:
+        if sink.enabled:
+            sink.emit(UnitSlain(unit))
+        return True
+    return False
+
+
+def play_round(attacking_unit, defending_unit, distance, sink=NULL_SINK):
+    """ Play a single battle round with attacking_unit as the active side
+
+    :returns: the victorious unit object (None if neither unit was slain), the distance between the units
+              at the end of the round, and the wounds inflicted on the defending and attacking units
+    """
     attacking_unit_models_lost = defending_unit_models_lost = 0
+    profiler = profiling.profiler
 
+    if profiler.enabled:
+        profiler.start(Phases.SHOOTING.value)
     if distance > 3:
         distance = max(distance - attacking_unit.movement, 3)
 
-    print("%s's shooting phase:\n" % attacking_unit.name)
-    wounds = simulate_attack(attacking_unit, defending_unit, distance, WeaponTypes.SHOOTING)
+    if sink.enabled:
+        sink.emit(PhaseStarted(Phases.SHOOTING, attacking_unit))
+    wounds = simulate_attack(attacking_unit, defending_unit, distance, WeaponTypes.SHOOTING, sink)
     defending_unit.assign_wounds(wounds)
     defending_unit_models_lost += wounds
 
-    if defending_unit.remaining_models() <= 0:
-        print("%s was slain!" % defending_unit.name)
-        return attacking_unit
+    if slain(defending_unit, sink):
+        return attacking_unit, distance, defending_unit_models_lost, attacking_unit_models_lost
 
     # FIXME: units should have a charge distance value defaulting to 12 (Judicators etc.)
     # XXX: this could potentially also be implemented as a constant and units could have a run/charge bonus field
+    if profiler.enabled:
+        profiler.start(Phases.CHARGE.value)
     if distance in range(3, 13):  # range is exclusive
         charge_roll = sum(DiceRoller.roll(2))
-        print("Charge roll: %d" % charge_roll)
+        if sink.enabled:
+            sink.emit(ChargeRolled(attacking_unit, charge_roll, charge_roll >= distance))
         if charge_roll >= distance:
             distance = 0  # Effective 0 distance post-charge
-            print("%s's charge succeeded!" % attacking_unit.name)
-        else:
-            print("%s's charge failed!" % attacking_unit.name)
 
     if distance < 3:
-        print("\n%s's combat phase:\n" % attacking_unit.name)
-        wounds = simulate_attack(attacking_unit, defending_unit, distance)
+        if profiler.enabled:
+            profiler.start(Phases.COMBAT.value)
+        if sink.enabled:
+            sink.emit(PhaseStarted(Phases.COMBAT, attacking_unit))
+        wounds = simulate_attack(attacking_unit, defending_unit, distance, sink=sink)
         defending_unit.assign_wounds(wounds)
         defending_unit_models_lost += wounds
 
-        if defending_unit.remaining_models() <= 0:
-            print("%s was slain!" % defending_unit.name)
-            return attacking_unit
+        if slain(defending_unit, sink):
+            return attacking_unit, distance, defending_unit_models_lost, attacking_unit_models_lost
 
-        wounds = simulate_attack(defending_unit, attacking_unit, distance)
+        wounds = simulate_attack(defending_unit, attacking_unit, distance, sink=sink)
         attacking_unit.assign_wounds(wounds)
         attacking_unit_models_lost += wounds
 
-        if attacking_unit.remaining_models() <= 0:
-            print("%s was slain!" % attacking_unit.name)
-            return defending_unit
+        if slain(attacking_unit, sink):
+            return defending_unit, distance, defending_unit_models_lost, attacking_unit_models_lost
 
-    print("Battleshock phase:\n")
+    if profiler.enabled:
+        profiler.start(Phases.BATTLESHOCK.value)
+    if sink.enabled:
+        sink.emit(PhaseStarted(Phases.BATTLESHOCK, attacking_unit))
     if defending_unit_models_lost > 0:
-        battleshock(defending_unit, defending_unit_models_lost)
+        battleshock(defending_unit, defending_unit_models_lost, sink)
 
-    if defending_unit.remaining_models() <= 0:
-        print("%s was slain!" % defending_unit.name)
-        return attacking_unit
+    if slain(defending_unit, sink):
+        return attacking_unit, distance, defending_unit_models_lost, attacking_unit_models_lost
 
     if attacking_unit_models_lost > 0:
-        battleshock(attacking_unit, attacking_unit_models_lost)
+        battleshock(attacking_unit, attacking_unit_models_lost, sink)
+
+    if slain(attacking_unit, sink):
+        return defending_unit, distance, defending_unit_models_lost, attacking_unit_models_lost
 
-    if attacking_unit.remaining_models() <= 0:
-        print("%s was slain!" % attacking_unit.name)
-        return defending_unit
+    if sink.enabled:
+        sink.emit(RoundEnded())
+    return None, distance, defending_unit_models_lost, attacking_unit_models_lost
 
-    print("\n%s\n" % ("-" * 105))
-    return simulate_combat(defending_unit, attacking_unit, distance=distance)
+
+MAX_ROUNDS = 100  # Battle rounds played before a battle is called a draw
+
+RoundResult = namedtuple('RoundResult', ['number', 'attacking_unit', 'distance', 'wounds_inflicted',
+                                         'wounds_suffered', 'winner'])
+
+
+class Battle:
+    """ Round-by-round state machine for a battle between two units
+
+    The units swap sides after every round. A battle can be stepped one round at a time and resumed at
+    any point; every round played is recorded in `rounds`.
+    """
+
+    def __init__(self, attacking_unit, defending_unit, distance=3, max_rounds=MAX_ROUNDS, sink=NULL_SINK):
+        self.attacking_unit = attacking_unit
+        self.defending_unit = defending_unit
+        self.distance = distance
+        self.max_rounds = max_rounds
+        self.sink = sink
+        self.rounds = []
+        self.winner = None
+        self.finished = False
+
+    def step(self):
+        winner, self.distance, wounds_inflicted, wounds_suffered = play_round(
+            self.attacking_unit, self.defending_unit, self.distance, self.sink)
+        if profiling.profiler.enabled:
+            profiling.profiler.stop()
+        result = RoundResult(len(self.rounds) + 1, self.attacking_unit, self.distance, wounds_inflicted,
+                             wounds_suffered, winner)
+        self.rounds.append(result)
+        if winner is not None:
+            self.winner = winner
+            self.finished = True
+        elif len(self.rounds) >= self.max_rounds:
+            self.finished = True
+            if self.sink.enabled:
+                self.sink.emit(BattleDrawn(len(self.rounds)))
+        else:
+            self.attacking_unit, self.defending_unit = self.defending_unit, self.attacking_unit
+        return result
+
+    def run(self):
+        while not self.finished:
+            self.step()
+        return self.winner
+
+
+def simulate_combat(attacking_unit, defending_unit, distance=3, sink=NULL_SINK, max_rounds=MAX_ROUNDS):
+    # returns the victorious unit object, or None if the battle is a draw
+    return Battle(attacking_unit, defending_unit, distance, max_rounds, sink).run()
 
 
 ATTACKER = 'attacker'
 DEFENDER = 'defender'
+DRAW = 'draw'
+
 
+def run_simulation(attacking_unit, defending_unit, simulations_to_run=100, distance=10, sink=NULL_SINK,
+                   max_rounds=MAX_ROUNDS):
+    """ Play simulations_to_run battles one at a time, resetting both units after each
 
-def run_simulation(attacking_unit, defending_unit, simulations_to_run=100, distance=10):
-    results = {ATTACKER: 0, DEFENDER: 0}
+    Nothing is printed unless a sink is given; pass events.PrintSink() for the full battle transcript.
+    """
+    results = {ATTACKER: 0, DEFENDER: 0, DRAW: 0}
     for n in range(1, simulations_to_run + 1):
-        print("\n%s\n" % ("#" * 105))
-        print("SIMULATION %d" % n)
-        print("\n%s\n" % ("#" * 105))
-        winning_unit = simulate_combat(attacking_unit, defending_unit, distance)
-        results[(ATTACKER if winning_unit == attacking_unit else DEFENDER)] += 1
+        if sink.enabled:
+            sink.emit(SimulationStarted(n))
+        winning_unit = simulate_combat(attacking_unit, defending_unit, distance, sink, max_rounds)
+        results[(DRAW if winning_unit is None else ATTACKER if winning_unit == attacking_unit else DEFENDER)] += 1
+        if profiling.profiler.enabled:
+            profiling.profiler.start(profiling.RESET)
         attacking_unit.reset()
         defending_unit.reset()
-    print("\n%s\n" % ("#" * 105))
-    print("Simulated %d battles between %d %s and %d %s." %
-          (simulations_to_run, attacking_unit.remaining_models(), attacking_unit.name,
-           defending_unit.remaining_models(), defending_unit.name))
-    print("%s had the initiative at a distance of %d inches" % (attacking_unit.name, distance))
-    print("%s won %d times, %s won %d times." %
-          (attacking_unit.name, results[ATTACKER], defending_unit.name, results[DEFENDER]))
-    print("\n%s\n" % ("#" * 105))
+        if profiling.profiler.enabled:
+            profiling.profiler.stop()
+    if sink.enabled:
+        sink.emit(SimulationFinished(attacking_unit, defending_unit, simulations_to_run, distance,
+                                     results[ATTACKER], results[DEFENDER], results[DRAW]))
+    return results
 
 
 def run():
     # Glade guard
+    # Peerless archery stays a function: it only applies while the unit has 20 or more models, and modifiers
+    # (see modifiers.py) can only depend on the target's keywords
     def peerless_archery(self, target):
         if self.remaining_models() >= 20:
-            for profile in self.shooting_attacks():
-                profile.to_hit -= 1
+            for profile in self.weapon_profiles:
+                if profile.weapon_type == WeaponTypes.SHOOTING:
+                    self.modifiers[profile].bonus_to_hit += 1
 
-    def bodkin_arrows(self, target):
-        for profile in self.shooting_attacks():
-            profile.rend = 3
+    bodkin_arrows = ModifierRules('rend = 3 for shooting')
 
     # TODO: Khemist
-    def aetheric_augmentation(self, target):
-        for name, profile in self.weapon_profiles.items():
-            profile.extra_attacks += profile.count
+    aetheric_augmentation = ModifierRules('attacks +1')
 
     # Rat Ogors
     # TODO: represent on-charge conditional
     def rabid_fury(self, target):
-        weapon_profile = self.weapon_profiles["Tearing Claws, Blades, and Fangs"]
-        weapon_profile.extra_attacks = (self.remaining_models() * weapon_profile.attacks *
-                                        (0 if (6 - weapon_profile.bonus_to_hit) > 6
-                                         else to_percentage(6 - weapon_profile.bonus_to_hit)))
+        weapon_profile = next(_ for _ in self.weapon_profiles if _.name == "Tearing Claws, Blades, and Fangs")
+        modifiers = self.modifiers[weapon_profile]
+        modifiers.extra_attacks = (self.remaining_models() * weapon_profile.attacks *
+                                   (0 if (6 - modifiers.bonus_to_hit) > 6
+                                    else to_percentage(6 - modifiers.bonus_to_hit)))
 
     def herded_into_the_fray(self, target):
-        self.weapon_profiles["Tearing Claws, Blades, and Fangs"].bonus_to_hit = 2
+        weapon_profile = next(_ for _ in self.weapon_profiles if _.name == "Tearing Claws, Blades, and Fangs")
+        self.modifiers[weapon_profile].bonus_to_hit = 2
 
     # for unit in attacking_group:
     #     calculate_attacks_vs_targets(unit, target_group)
@@ -259,7 +372,6 @@ def run():
     defending_unit_cls = UNITS['Wildwood Rangers']
     attacking_unit = attacking_unit_cls()
     # TODO: implement maximums for models <-----
-    # FIXME: models are singletons (sortof) so we need a way of having weapon profile instances
     # FIXME: need a much better way of accessing model types...
     attacking_unit.add_models('Arkanaut', 6)
     attacking_unit.add_models('Arkanaut with Light Skyhook', 3)
@@ -284,6 +396,7 @@ def run():
         defending_unit=defending_unit,
         simulations_to_run=10,  # simulations,
         distance=10,  # distance
+        sink=PrintSink(),
     )
 
 
@@ -0,0 +1,95 @@
+""" Precomputed dice probabilities for the hit, wound and save chain
+
+This is the single source of the rules for turning a characteristic plus modifiers into a roll:
+a roll of 1 always fails and a 6 always hits or wounds, while a save that needs more than 6 cannot be made.
+The analytic and simulated engines all look their numbers up here.
+"""
+from enum import Enum
+
+
+class Rerolls(Enum):
+    NONE = "none"
+    ONES = "ones"
+    FAILED = "failed"
+
+
+# Range of characteristic + modifier values covered by the tables; anything outside is clamped first
+MIN_NEEDED = -6
+MAX_NEEDED = 13
+
+NO_SAVE = 7  # Roll needed for a save that cannot be made
+
+
+def clamp(needed):
+    return min(max(needed, MIN_NEEDED), MAX_NEEDED)
+
+
+def build_roll_table(save=False):
+    highest = NO_SAVE if save else 6
+    return {needed: min(max(needed, 2), highest) for needed in range(MIN_NEEDED, MAX_NEEDED + 1)}
+
+
+def build_success_table():
+    table = {}
+    for rerolls in Rerolls:
+        for roll in range(2, NO_SAVE + 1):
+            chance = (7 - roll) / 6
+            if rerolls is Rerolls.ONES:
+                chance += chance / 6
+            elif rerolls is Rerolls.FAILED:
+                chance += (1 - chance) * chance
+            table[rerolls, roll] = chance
+    return table
+
+
+# The D6 roll a hit or wound needs, indexed by characteristic + modifier
+HIT_ROLL = build_roll_table()
+# The D6 roll a save needs, indexed by save + rend
+SAVE_ROLL = build_roll_table(save=True)
+# Chance of rolling at least a given D6 roll, indexed by (Rerolls, roll)
+SUCCESS_CHANCE = build_success_table()
+
+
+def build_chain_table():
+    table = {}
+    for hit_rerolls in Rerolls:
+        for wound_rerolls in Rerolls:
+            for hits_on in range(2, 7):
+                for wounds_on in range(2, 7):
+                    wound_chance = SUCCESS_CHANCE[hit_rerolls, hits_on] * SUCCESS_CHANCE[wound_rerolls, wounds_on]
+                    for saves_on in range(2, NO_SAVE + 1):
+                        table[hit_rerolls, wound_rerolls, hits_on, wounds_on, saves_on] = \
+                            wound_chance * (1 - SUCCESS_CHANCE[Rerolls.NONE, saves_on])
+    return table
+
+
+# Chance that one attack hits, wounds and is not saved, indexed by (hit Rerolls, wound Rerolls, hit roll,
+# wound roll, save roll) where the rolls are those given by HIT_ROLL and SAVE_ROLL
+DAMAGING_HIT_CHANCE = build_chain_table()
+
+
+def hit_roll(needed):
+    return HIT_ROLL[clamp(needed)]
+
+
+def save_roll(target_save, rend=0):
+    return SAVE_ROLL[clamp(target_save + rend)]
+
+
+def reroll_below(rerolls, roll):
+    """ Dice that roll less than this are re-rolled, when `roll` is needed """
+    return {Rerolls.NONE: 1, Rerolls.ONES: 2, Rerolls.FAILED: roll}[rerolls]
+
+
+def success_chance(needed, rerolls=Rerolls.NONE):
+    return SUCCESS_CHANCE[rerolls, HIT_ROLL[clamp(needed)]]
+
+
+def save_chance(target_save, rend=0, rerolls=Rerolls.NONE):
+    return SUCCESS_CHANCE[rerolls, SAVE_ROLL[clamp(target_save + rend)]]
+
+
+def damaging_hit_chance(hits_on, wounds_on, rend, target_save, hit_rerolls=Rerolls.NONE,
+                        wound_rerolls=Rerolls.NONE):
+    return DAMAGING_HIT_CHANCE[hit_rerolls, wound_rerolls, HIT_ROLL[clamp(hits_on)], HIT_ROLL[clamp(wounds_on)],
+                               SAVE_ROLL[clamp(target_save + rend)]]
@@ -0,0 +1,31 @@
+import pytest
+
+from data import database
+
+
+@pytest.fixture(scope='session', autouse=True)
+def catalog():
+    """ Build every unit from a throwaway in-memory database loaded from the .sql files """
+    database.connect(database.MEMORY_DB)
+    database.initialize_db()
+    yield
+    database.close()
+
+
+@pytest.fixture
+def arkanauts():
+    from unit import UNITS
+    unit = UNITS['Arkanaut Company']()
+    unit.add_models('Arkanaut', 6)
+    unit.add_models('Arkanaut with Light Skyhook', 3)
+    unit.add_models('Arkanaut Captain', 1)
+    return unit
+
+
+@pytest.fixture
+def rangers():
+    from unit import UNITS
+    unit = UNITS['Wildwood Rangers']()
+    unit.add_models('Ranger', 9)
+    unit.add_models('Warden', 1)
+    return unit
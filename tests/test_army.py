@@ -0,0 +1,34 @@
+import army
+import batch
+from modifiers import ModifierRules
+from unit import UNITS
+
+
+def test_mixed_keyword_targets(rangers, arkanauts):
+    # "damage = 2 vs MONSTER" gives the rangers' draiches a different fixed damage against each target
+    monsters = UNITS['Arkanaut Company']()
+    monsters.add_models('Arkanaut', 6)
+    monsters.keywords.append('MONSTER')
+    damage = batch.BatchUnit(rangers, [arkanauts, monsters]).weapons[0].damage
+    assert [type(value) for value in damage] == [int, int]
+
+    results = army.run_army_simulation([rangers], [arkanauts, monsters], 2000, distances=2, seed=1)
+    assert sum(results.values()) == 2000
+
+
+def test_one_unit_army_matches_batch_with_buffs(arkanauts, rangers):
+    ModifierRules('to_hit +2', 'rend = 3')(arkanauts, rangers)
+    assert (army.run_army_simulation([arkanauts], [rangers], 2000, seed=1) ==
+            batch.run_batch_simulation(arkanauts, rangers, 2000, seed=1))
+
+
+def test_lambda_policies_are_not_memoized(arkanauts, rangers):
+    hordes = UNITS['Arkanaut Company']()
+    hordes.add_models('Arkanaut', 20)
+    defenders = [rangers, hordes]
+
+    def run(policy):
+        return army.run_army_simulation([arkanauts], defenders, 1000, distances=[[30, 2]], policy=policy, seed=1)
+
+    assert (run(lambda distances, models: army.nearest(distances, models)) == run(army.nearest) !=
+            run(lambda distances, models: army.strongest(distances, models)) == run(army.strongest))
@@ -0,0 +1,19 @@
+import numpy as np
+
+import batch
+from modifiers import ModifierRules
+
+
+def test_paired_battles_share_their_dice(arkanauts, rangers):
+    battles = 4000
+    defender = batch.BatchUnit(rangers, [arkanauts])
+    baseline = batch.BatchUnit(arkanauts, [rangers])
+    ModifierRules('to_hit +1')(arkanauts, rangers)
+    variant = batch.BatchUnit(arkanauts, [rangers])
+
+    entropy = np.random.SeedSequence(1).entropy
+    wins = batch.attacker_wins(entropy, baseline, defender, battles, distance=2)
+    paired = batch.attacker_wins(entropy, variant, defender, battles, distance=2) - wins
+    independent = batch.attacker_wins(entropy + 1, variant, defender, battles, distance=2) - wins
+    assert paired.mean() > 0.1
+    assert paired.var() < 0.5 * independent.var()
@@ -0,0 +1,10 @@
+from cache import ResultCache
+
+
+def test_hits_are_copies():
+    cache = ResultCache()
+    results = cache.set('key', {'attacker': 1000})
+    results['attacker'] += 500
+    hit = cache.get('key')
+    hit['attacker'] += 500
+    assert cache.get('key') == {'attacker': 1000}
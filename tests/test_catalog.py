@@ -0,0 +1,36 @@
+from data import database, repository
+from data.catalog import JsonCatalog
+from parallel import run_parallel_simulation
+
+
+def plain_template(template):
+    """ A UnitTemplate without the ids each catalog gives its rows """
+    models = [(model.name, model.type, [weapon.__reduce__()[1] for weapon in model.weapons])
+              for model in template.models]
+    return template._replace(id=None, models=models)
+
+
+def test_json_catalog_matches_database():
+    templates = repository.UnitRepository().load()
+    catalog = JsonCatalog()
+    for name, template in templates.items():
+        assert plain_template(catalog.get_unit_template(name)) == plain_template(template)
+
+
+def test_parallel_simulation_from_json_catalog(arkanauts, rangers):
+    results = run_parallel_simulation(arkanauts, rangers, 200, seed=1, workers=2, chunk_size=100,
+                                      catalog=JsonCatalog())
+    assert sum(results.values()) == 200
+
+
+def test_database_opened_on_first_use(tmp_path):
+    path = tmp_path / 'units.db'
+    database.connect(str(path))
+    try:
+        assert database.connections is None and not path.exists()
+        database.initialize_db()
+        database.close()
+        assert 'Arkanaut Company' in repository.UnitRepository().load()
+    finally:
+        database.connect(database.MEMORY_DB)
+        database.initialize_db()
@@ -0,0 +1,21 @@
+import threading
+
+import dice
+from dice import DiceRoller
+
+
+def test_each_thread_rolls_from_its_own_seeded_buffer():
+    rolls = {}
+
+    def roll(name):
+        dice.seed(1)
+        rolls[name] = [DiceRoller.successes(20, 4) + DiceRoller.d3() for _ in range(5000)]
+
+    threads = [threading.Thread(target=roll, args=(name,)) for name in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dice.seed(1)
+    expected = [DiceRoller.successes(20, 4) + DiceRoller.d3() for _ in range(5000)]
+    assert all(thread_rolls == expected for thread_rolls in rolls.values())
@@ -0,0 +1,29 @@
+import pytest
+
+import tables
+from dice import DiceRoller, as_dice
+from distributions import damage_distribution
+from tables import Rerolls
+
+# attacks, hits_on, wounds_on, rend, damage, target_save, count, hit_rerolls, wound_rerolls
+PROFILES = [
+    (2, 3, 4, -1, 1, 4, 10, Rerolls.NONE, Rerolls.NONE),
+    (DiceRoller.d6, 4, 3, 0, DiceRoller.d3, 5, 1, Rerolls.ONES, Rerolls.NONE),
+    (1, 2, 2, -2, 3, 3, 3, Rerolls.FAILED, Rerolls.ONES),
+    (DiceRoller.d3, 5, 4, 0, DiceRoller.d6, 6, 2, Rerolls.NONE, Rerolls.FAILED),
+]
+
+
+def expected_value(value):
+    value = as_dice(value)
+    return value if isinstance(value, int) else (value.sides + 1) / 2
+
+
+@pytest.mark.parametrize('attacks,hits_on,wounds_on,rend,damage,target_save,count,hit_rerolls,wound_rerolls',
+                         PROFILES)
+def test_mean_is_attacks_times_chance_times_damage(attacks, hits_on, wounds_on, rend, damage, target_save, count,
+                                                   hit_rerolls, wound_rerolls):
+    distribution = damage_distribution(attacks, hits_on, wounds_on, rend, damage, target_save, count,
+                                       hit_rerolls=hit_rerolls, wound_rerolls=wound_rerolls)
+    chance = tables.damaging_hit_chance(hits_on, wounds_on, rend, target_save, hit_rerolls, wound_rerolls)
+    assert distribution.mean() == pytest.approx(count * expected_value(attacks) * chance * expected_value(damage))
@@ -0,0 +1,38 @@
+import math
+
+import army
+import batch
+import markov
+import stats
+
+Z = 4  # Standard errors allowed between a simulated and an exact chance
+
+
+def within_error(wins, battles, chance):
+    return abs(wins / battles - chance) <= Z * math.sqrt(chance * (1 - chance) / battles) + 1e-9
+
+
+def test_engines_apply_abilities_that_match_keywords(arkanauts, rangers):
+    untagged = markov.solve_battle(arkanauts, rangers, distance=2)[stats.ATTACKER]
+    # Arkanauts hit HEROes more easily and rangers deal 2 damage to MONSTERs
+    arkanauts.keywords.append('MONSTER')
+    rangers.keywords.append('HERO')
+    exact = markov.solve_battle(arkanauts, rangers, distance=2)[stats.ATTACKER]
+    assert abs(exact - untagged) > 0.02
+
+    battles = 4000
+    results = batch.run_batch_simulation(arkanauts, rangers, battles, distance=2, seed=1)
+    assert army.run_army_simulation([arkanauts], [rangers], battles, distances=2, seed=1) == results
+    assert within_error(results[stats.ATTACKER], battles, exact)
+    battles = 1000
+    results = stats.run_simulation(arkanauts, rangers, battles, distance=2)
+    assert within_error(results[stats.ATTACKER], battles, exact)
+
+
+def test_batch_engine_matches_markov_solver(arkanauts, rangers):
+    battles = 4000
+    for distance in (2, 10, 20):
+        exact = markov.solve_battle(arkanauts, rangers, distance)
+        results = batch.run_batch_simulation(arkanauts, rangers, battles, distance, seed=distance)
+        for result in (stats.ATTACKER, stats.DEFENDER, stats.DRAW):
+            assert within_error(results[result], battles, exact[result])
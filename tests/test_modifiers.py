@@ -0,0 +1,54 @@
+import pytest
+
+import batch
+import markov
+import stats
+from distributions import weapon_damage_distribution
+from modifiers import InvalidModifierException, ModifierRules, parse_modifier
+from tables import Rerolls
+from test_engines import within_error
+from unit import UNITS
+
+
+def arkanauts_with(rule, target):
+    unit = UNITS['Arkanaut Company']()
+    unit.add_models('Arkanaut', 6)
+    ModifierRules(rule)(unit, target)
+    return unit
+
+
+def test_attacks_bonus_is_per_model(rangers):
+    unit = arkanauts_with('attacks +1 for shooting', rangers)
+    pistols = next(unit.resolve(weapon) for weapon in unit.weapon_profiles if weapon.name == 'Privateer Pistols')
+    # 6 models with 3 attacks each, hitting and wounding on 4+ against a 5+ save
+    assert abs(weapon_damage_distribution(pistols, rangers.save, 6).mean() - 18 / 6) < 1e-9
+
+
+def test_attacks_penalty_stops_at_none(rangers):
+    unit = arkanauts_with('attacks -3', rangers)
+    for weapon in unit.weapon_profiles:
+        assert weapon_damage_distribution(unit.resolve(weapon), rangers.save, 6).mean() == 0
+    assert batch.run_batch_simulation(unit, rangers, 100, seed=1)['attacker'] == 0
+    assert markov.solve_battle(unit, rangers, max_rounds=10)['attacker'] == 0
+
+
+def test_rerolls_reach_every_engine(arkanauts, rangers):
+    untouched = markov.solve_battle(arkanauts, rangers, distance=2)[stats.ATTACKER]
+    ModifierRules('to_hit reroll failed', 'to_wound reroll ones')(arkanauts, rangers)
+    profile = arkanauts.resolve(arkanauts.weapon_profiles[0])
+    assert (profile.hit_rerolls, profile.wound_rerolls) == (Rerolls.FAILED, Rerolls.ONES)
+
+    exact = markov.solve_battle(arkanauts, rangers, distance=2)[stats.ATTACKER]
+    assert exact > untouched + 0.05
+    battles = 4000
+    results = batch.run_batch_simulation(arkanauts, rangers, battles, distance=2, seed=1)
+    assert within_error(results[stats.ATTACKER], battles, exact)
+    battles = 1000
+    results = stats.run_simulation(arkanauts, rangers, battles, distance=2)
+    assert within_error(results[stats.ATTACKER], battles, exact)
+
+
+def test_reroll_needs_ones_or_failed():
+    for rule in ('to_hit reroll 1', 'rend reroll ones', 'to_hit + ones'):
+        with pytest.raises(InvalidModifierException):
+            parse_modifier(rule)
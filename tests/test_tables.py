@@ -0,0 +1,51 @@
+from itertools import product
+
+import pytest
+
+import tables
+from tables import Rerolls
+
+D6 = range(1, 7)
+
+
+def succeeds(die, roll):
+    """ A hit or wound roll: a 1 always fails and a 6 always succeeds """
+    return die != 1 and (die == 6 or die >= roll)
+
+
+def brute_force_chance(needed, rerolls):
+    """ Chance of success, enumerating the first die and the re-roll of every die that may be re-rolled """
+    roll = tables.hit_roll(needed)
+    chance = 0
+    for first, second in product(D6, D6):
+        if rerolls is Rerolls.ONES:
+            rerolled = first == 1
+        else:
+            rerolled = rerolls is Rerolls.FAILED and not succeeds(first, roll)
+        chance += succeeds(second if rerolled else first, roll) / 36
+    return chance
+
+
+@pytest.mark.parametrize('rerolls', list(Rerolls))
+def test_success_chances_match_enumeration(rerolls):
+    for needed in range(-2, 10):
+        assert tables.success_chance(needed, rerolls) == pytest.approx(brute_force_chance(needed, rerolls))
+
+
+def brute_force_save(target_save, rend):
+    """ Chance of a save, which fails on a 1 and, unlike a hit, on anything below the save needed """
+    return sum(die != 1 and die >= target_save + rend for die in D6) / 6
+
+
+def test_saves_match_enumeration():
+    for target_save, rend in product(range(1, 8), range(-3, 2)):
+        assert tables.save_chance(target_save, rend) == pytest.approx(brute_force_save(target_save, rend))
+
+
+@pytest.mark.parametrize('hit_rerolls,wound_rerolls', list(product(Rerolls, Rerolls)))
+def test_damaging_hit_chance_matches_enumeration(hit_rerolls, wound_rerolls):
+    for hits_on, wounds_on, rend, target_save in product(range(2, 7), range(2, 7), (0, -1, -3), (3, 5, 7)):
+        chance = (brute_force_chance(hits_on, hit_rerolls) * brute_force_chance(wounds_on, wound_rerolls)
+                  * (1 - brute_force_save(target_save, rend)))
+        assert tables.damaging_hit_chance(hits_on, wounds_on, rend, target_save, hit_rerolls, wound_rerolls) \
+            == pytest.approx(chance)
@@ -0,0 +1,83 @@
+from itertools import permutations
+
+import numpy as np
+
+import registry
+import stats
+import units
+from batch import BatchUnit, run_batch_simulation
+from model import Model
+from modifiers import ModifierRules
+from unit import UNITS
+
+
+def test_units_register_again_after_clear():
+    cls = UNITS['Arkanaut Company']
+    UNITS.clear()
+    stats.import_units(units)
+    assert UNITS['Arkanaut Company'] is cls
+    del UNITS['Arkanaut Company']
+    assert UNITS['Arkanaut Company'] is cls
+
+
+def arkanauts(count):
+    unit = UNITS['Arkanaut Company']()
+    unit.add_models('Arkanaut', count)
+    return unit
+
+
+def test_batch_results_keyed_on_starting_models(rangers):
+    # Both units have 6 models left, but every batch battle starts from the unit's full model_counts
+    six, ten = arkanauts(6), arkanauts(10)
+    assert run_batch_simulation(six, rangers, 500, seed=1) != run_batch_simulation(ten, rangers, 500, seed=1)
+    expected = run_batch_simulation(ten, rangers, 500, seed=1)
+    ten.remove_models(4)
+    assert run_batch_simulation(ten, rangers, 500, seed=1) == expected
+
+
+def test_reset_keeps_buffs(arkanauts, rangers):
+    ModifierRules('to_hit +2', 'rend = 3')(arkanauts, rangers)
+    buffed = [arkanauts.resolve(weapon) for weapon in arkanauts.weapon_profiles]
+    stats.run_simulation(arkanauts, rangers, 5)
+    assert [arkanauts.resolve(weapon) for weapon in arkanauts.weapon_profiles] == buffed
+    assert arkanauts.remaining_models() == 10
+
+
+def test_manifest_falls_back_to_scan_when_unwritable(tmp_path):
+    path = tmp_path / 'missing' / 'manifest.json'
+    modules = registry.load_manifest(str(path))
+    assert modules['Arkanaut Company'] == 'units.order.kharadron_overlords.arkanaut_company'
+    assert not path.exists()
+
+
+def remove_one_at_a_time(models_remaining, models_slain):
+    """ Unit.remove_models as it was before removal_order: a search over every model type per model slain """
+    for _ in range(models_slain):
+        model_to_remove = None
+        for model, count in models_remaining.items():
+            if count <= 0:
+                continue
+            # Remove base models first, then special models, then unit leaders
+            if (model_to_remove is None or model.type == Model.BASE_TYPE
+                    or (model_to_remove.type == Model.LEADER_TYPE and model.type == Model.SPECIAL_TYPE)):
+                model_to_remove = model
+        if model_to_remove:
+            models_remaining[model_to_remove] -= 1
+
+
+def test_removal_order_matches_one_at_a_time_removal():
+    counts = {'Arkanaut': 4, 'Arkanaut with Light Skyhook': 2, 'Arkanaut Captain': 1}
+    for names in permutations(counts):
+        for models_slain in range(sum(counts.values()) + 2):
+            unit = UNITS['Arkanaut Company']()
+            for name in names:
+                unit.add_models(name, counts[name])
+            expected = unit.models_remaining.copy()
+            remove_one_at_a_time(expected, models_slain)
+            unit.remove_models(models_slain)
+            assert unit.models_remaining == expected
+
+            batch_unit = BatchUnit(unit)
+            models = batch_unit.counts[None, :].copy()
+            batch_unit.remove_models(models, np.array([models_slain]))
+            assert models[0].tolist() == [expected[model] for model in unit.model_counts]
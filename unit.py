@@ -1,13 +1,73 @@
 import abc
+import importlib
+import sys
+from collections.abc import MutableMapping
 from enum import Enum
 from functools import reduce
 from uuid import uuid4 as uuid
 
-from data import database
+from data import repository
+from dice import as_dice
 from model import Model
-from weapons import WeaponProfile
+from modifiers import compile_rules, profile_table
+from weapons import WeaponModifiers
 
-UNITS = {}  # Global dictionary to hold all unit names + classes
+
+class UnitRegistry(MutableMapping):
+    """ Maps unit names to Unit subclasses, importing a unit's module the first time it is looked up
+
+    Unit subclasses register themselves when their module is imported. Modules that have not been imported
+    yet are known from the manifest (see registry.py); `finder` is called to rescan for a name that is
+    in neither. A module only runs once, so every class ever registered is also kept in `loaded`, from which
+    units removed from the registry are registered again when their module is looked up or imported.
+    """
+
+    def __init__(self):
+        self.classes = {}
+        self.modules = {}
+        self.loaded = {}
+        self.finder = None
+
+    def add_modules(self, modules):
+        self.modules.update(modules)
+
+    def __getitem__(self, unit_name):
+        if unit_name not in self.classes:
+            if unit_name not in self.modules and self.finder:
+                self.add_modules(self.finder())
+            if unit_name in self.modules:
+                self.register_module(importlib.import_module(self.modules[unit_name]))
+        return self.classes[unit_name]
+
+    def register_module(self, module):
+        """ Register the units of an imported module again, if they were removed after it was first imported """
+        for unit_name, cls in self.loaded.items():
+            if cls.__module__ == module.__name__:
+                self.classes.setdefault(unit_name, cls)
+
+    def __contains__(self, unit_name):
+        return unit_name in self.classes or unit_name in self.modules
+
+    def __setitem__(self, unit_name, cls):
+        self.classes[unit_name] = cls
+        self.loaded[unit_name] = cls
+
+    def __delitem__(self, unit_name):
+        self.modules.pop(unit_name, None)
+        del self.classes[unit_name]
+
+    def __iter__(self):
+        return iter(dict.fromkeys([*self.modules, *self.classes]))
+
+    def __len__(self):
+        return len(self.modules.keys() | self.classes.keys())
+
+    def clear(self):
+        self.classes.clear()
+        self.modules.clear()
+
+
+UNITS = UnitRegistry()  # Global registry of all unit names + classes
 
 
 class UnitTypes(Enum):
@@ -21,33 +81,46 @@ class Unit:
 
     __metaclass__ = abc.ABCMeta
 
+    MODIFIERS = ()  # Declarative abilities, applied against every target (see modifiers.py)
+
     def __init__(self, name):
-        unit_id, unit_name, movement, save, bravery, wounds = database.get_unit_by_name(name)
+        template = repository.get_unit_template(name)
         models = {}
-        for model_id, unit_id, model_name, model_type in database.get_models_by_unit_id(unit_id):
-            profiles = database.get_weapon_profiles_by_model_id(model_id)
-            models[model_name] = Model(name=model_name, model_type=model_type, weapons=[])
-            for _, _, profile_id in profiles:
-                models[model_name].weapons.append(WeaponProfile(*database.get_weapon_profile_by_id(profile_id)))
+        for model in template.models:
+            models[model.name] = Model(name=model.name, model_type=model.type,
+                                       weapons=list(model.weapons))
 
         # TODO: implement damage tables
         self.name = name
         self.id = uuid()
-        self.movement = movement
-        self.bravery = bravery
-        self.wounds = wounds
-        self.save = save
+        self.movement = template.movement
+        self.bravery = template.bravery
+        self.wounds = template.wounds
+        self.save = template.save
         self.models = models
-        self.unit_types = database.get_unit_types_by_unit_id(unit_id)
-        self.keywords = database.get_keywords_by_unit_id(unit_id)
+        self.unit_types = list(template.unit_types)
+        self.keywords = list(template.keywords)
         self.model_counts = {}  # FIXME: there should be a better way to set the base count for models initially
         self.models_remaining = {}
+        self.removal_order = []
         self.wounds_remaining = 0
         self.abilities = []
         self.buffs = {}
         self.weapon_profiles = reduce(lambda x, y: x + y.weapons, self.models.values(), [])
+        # Weapon profiles are shared between instances of a unit, so abilities and buffs modify these instead
+        self.modifiers = {weapon_profile: WeaponModifiers() for weapon_profile in self.weapon_profiles}
+        self.modifier_rules = compile_rules(tuple(self.MODIFIERS))
+        if self.modifier_rules:
+            self.add_ability(self.apply_modifier_rules)
         self.init_abilities()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Unit modules declare the name of their unit as UNIT_NAME
+        unit_name = getattr(sys.modules[cls.__module__], 'UNIT_NAME', None)
+        if unit_name is not None:
+            UNITS[unit_name] = cls
+
     def __hash__(self):
         return hash(self.id)
 
@@ -72,18 +145,46 @@ class Unit:
         else:
             self.model_counts[model] = count
             self.models_remaining[model] = count
+            self.removal_order = removal_order(self.model_counts)
         # FIXME: are there individual models in a unit with additional wounds?
         self.wounds_remaining += self.wounds * count
 
+    def apply_modifier_rules(self, target):
+        self.modifier_rules(self, target)
+
+    def resolve(self, weapon_profile):
+        return self.modifiers[weapon_profile].resolve(weapon_profile)
+
+    def resolve_against(self, target):
+        """ Each weapon profile resolved with the unit's declarative abilities against target
+
+        The unit's current modifiers (its buffs) are applied on top, so abilities should not have been applied
+        to them as well.
+
+        :returns: dict of WeaponProfile to ResolvedProfile
+        """
+        resolved = profile_table(tuple(self.weapon_profiles), self.modifier_rules).resolve(target.keywords)
+        return {profile: self.modifiers[profile].overlay(resolved[profile]) for profile in self.weapon_profiles}
+
+    def fingerprint(self, model_counts=None):
+        """ Everything about the unit's current state that affects its attacks and defence, as plain data
+
+        :param model_counts: the models to describe, models_remaining by default; engines that start every battle
+                             from the full unit pass model_counts
+        """
+        model_counts = self.models_remaining if model_counts is None else model_counts
+        models = [(model.name, model.type, count,
+                   [[plain_value(value) for value in self.resolve(weapon)[1:]]
+                    for weapon in model.weapons])
+                  for model, count in model_counts.items()]
+        return [self.name, self.movement, self.save, self.bravery, self.wounds, sorted(self.keywords), models]
+
     def reset_buffs(self):
-        # TODO: these should be stored elsewhere as the profile is shared between instances of a unit
-        for weapon_profile in self.weapon_profiles:
-            weapon_profile.extra_attacks = 0
-            weapon_profile.bonus_to_hit = 0
-            weapon_profile.bonus_to_wound = 0
+        for modifiers in self.modifiers.values():
+            modifiers.reset()
 
     def reset(self):
-        self.reset_buffs()
+        """ Restore the unit's models and wounds after a battle, keeping its buffs for the next one """
         self.models_remaining = self.model_counts.copy()
         self.wounds_remaining = self.wounds
 
@@ -104,23 +205,36 @@ class Unit:
         return sum(self.models_remaining.values())
 
     def remove_models(self, models_slain):
-        for _ in range(models_slain):
-            model_to_remove = None
-            for model, count in self.models_remaining.items():
-                if count <= 0:
-                    continue
-                # Remove base models first, then special models, then unit leaders
-                if (model_to_remove is None or model.type == Model.BASE_TYPE
-                        or (model_to_remove.type == Model.LEADER_TYPE and model.type == Model.SPECIAL_TYPE)):
-                    model_to_remove = model
-            if model_to_remove:
-                self.models_remaining[model_to_remove] -= 1
+        # Take whole buckets of models in removal order rather than searching for each model slain
+        for model in self.removal_order:
+            if models_slain <= 0:
+                break
+            removed = min(self.models_remaining[model], models_slain)
+            self.models_remaining[model] -= removed
+            models_slain -= removed
 
     @abc.abstractmethod
     def init_abilities(self):
         pass
 
 
+def removal_order(models):
+    """ Order in which models are removed as casualties
+
+    Base models are removed first (the last type added first), then special models, then unit leaders.
+    """
+    models = list(models)
+    return ([model for model in reversed(models) if model.type == Model.BASE_TYPE] +
+            [model for model in models if model.type == Model.SPECIAL_TYPE] +
+            [model for model in models if model.type not in (Model.BASE_TYPE, Model.SPECIAL_TYPE)])
+
+
+def plain_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    return as_dice(value).value if callable(value) else value
+
+
 # Custom exception classes
 class NoSuchModelException(Exception):
     pass
@@ -34,6 +34,38 @@ INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, re
     (SELECT id FROM units WHERE name="Arkanaut Company"),
     "Gun Butts", 1, "1", 4, 5, 0, "1"
 );
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Rapid-fire Rivet Gun", 12, "3", 3, 4, 1, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Aethermatic Saw", 1, "1", 3, 2, 2, "d3"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Aethermatic Saw", 1, "2", 3, 2, 2, "d3"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Gun Butt", 1, "1", 4, 5, 0, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Brokk Grungsson"),
+    "Grungsson's Boast", 18, "2", 3, 2, 1, "d3"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Brokk Grungsson"),
+    "Magnate's Charter", 18, "3", 3, 3, 1, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Brokk Grungsson"),
+    "Aetherblasters", 9, "2", 3, 4, 0, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Brokk Grungsson"),
+    "Aethermatic Saw", 1, "4", 3, 2, 2, "d3"
+);
 
 
 
@@ -51,6 +83,24 @@ INSERT INTO models (unit_id, name, type) VALUES (
     "Arkanaut with Light Skyhook",
     "Special"
 );
+INSERT INTO models (unit_id, name) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Endrinrigger"
+);
+INSERT INTO models (unit_id, name, type) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Mizzenmaster",
+    "Leader"
+);
+INSERT INTO models (unit_id, name, type) VALUES (
+    (SELECT id FROM units WHERE name="Endrinriggers"),
+    "Endrinrigger with Grapnel Launcher",
+    "Special"
+);
+INSERT INTO models (unit_id, name) VALUES (
+    (SELECT id FROM units WHERE name="Brokk Grungsson"),
+    "Brokk"
+);
 
 
 
@@ -78,6 +128,42 @@ INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
     (SELECT id FROM models WHERE name="Arkanaut with Light Skyhook"),
     (SELECT id FROM weapon_profiles WHERE name="Gun Butts")
 );
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Endrinrigger"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Endrinriggers") AND name="Rapid-fire Rivet Gun")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Endrinrigger"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Endrinriggers") AND name="Aethermatic Saw" AND attacks="1")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Mizzenmaster"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Endrinriggers") AND name="Rapid-fire Rivet Gun")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Mizzenmaster"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Endrinriggers") AND name="Aethermatic Saw" AND attacks="2")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Endrinrigger with Grapnel Launcher"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Endrinriggers") AND name="Gun Butt")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Brokk"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Brokk Grungsson") AND name="Grungsson's Boast")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Brokk"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Brokk Grungsson") AND name="Magnate's Charter")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Brokk"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Brokk Grungsson") AND name="Aetherblasters")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Brokk"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Brokk Grungsson") AND name="Aethermatic Saw")
+);
 
 
 
@@ -15,6 +15,22 @@ INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, re
     (SELECT id FROM units WHERE name="Wildwood Rangers"),
     "Warden's Draich", 2, "3", 3, 4, 1, "1"
 );
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    "Longbows", 20, "1", 4, 4, 0, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    "Glade Blades", 1, "1", 5, 5, 0, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    "Longbow", 20, "2", 4, 4, 0, "1"
+);
+INSERT INTO weapon_profiles (unit_id, name, range, attacks, to_hit, to_wound, rend, damage) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    "Glade Blade", 1, "1", 5, 5, 0, "1"
+);
 
 
 
@@ -27,6 +43,15 @@ INSERT INTO models (unit_id, name, type) VALUES (
     "Warden",
     "Leader"
 );
+INSERT INTO models (unit_id, name) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    "Guard"
+);
+INSERT INTO models (unit_id, name, type) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    "Lord's Bowman",
+    "Leader"
+);
 
 
 
@@ -38,3 +63,26 @@ INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
     (SELECT id FROM models WHERE name="Warden"),
     (SELECT id FROM weapon_profiles WHERE name="Warden's Draich")
 );
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Guard"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Glade Guard") AND name="Longbows")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Guard"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Glade Guard") AND name="Glade Blades")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Lord's Bowman"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Glade Guard") AND name="Longbow")
+);
+INSERT INTO models_weapon_profiles (model_id, weapon_profile_id) VALUES (
+    (SELECT id FROM models WHERE name="Lord's Bowman"),
+    (SELECT id FROM weapon_profiles WHERE unit_id=(SELECT id FROM units WHERE name="Glade Guard") AND name="Glade Blade")
+);
+
+
+
+INSERT INTO units_unit_types (unit_id, unit_type_id) VALUES (
+    (SELECT id FROM units WHERE name="Glade Guard"),
+    (SELECT id FROM unit_types WHERE name="Battleline")
+);
@@ -1,5 +1,8 @@
+from collections import namedtuple
 from enum import Enum
 
+from tables import Rerolls
+
 
 class WeaponProfileTypes(Enum):
     CORE = "Core"
@@ -13,6 +16,12 @@ class WeaponTypes(Enum):
 
 
 class WeaponProfile:
+    """ A weapon's base characteristics, shared by every instance of a unit and never modified
+
+    Abilities and buffs change a unit's WeaponModifiers instead, which are resolved at attack time.
+    """
+
+    __slots__ = ('name', 'weapon_range', 'weapon_type', 'attacks', 'to_hit', 'to_wound', 'rend', 'damage')
 
     def __init__(self,
                  name,
@@ -22,14 +31,68 @@ class WeaponProfile:
                  to_wound=4,
                  rend=0,
                  damage=1):
-        self.name = name
-        self.weapon_range = weapon_range
-        self.weapon_type = WeaponTypes.COMBAT if weapon_range <= 3 else WeaponTypes.SHOOTING
-        self.attacks = attacks
-        self.to_hit = to_hit
-        self.to_wound = to_wound
-        self.rend = rend
-        self.damage = damage
+        set_field = super().__setattr__
+        set_field('name', name)
+        set_field('weapon_range', weapon_range)
+        set_field('weapon_type', WeaponTypes.COMBAT if weapon_range <= 3 else WeaponTypes.SHOOTING)
+        set_field('attacks', attacks)
+        set_field('to_hit', to_hit)
+        set_field('to_wound', to_wound)
+        set_field('rend', rend)
+        set_field('damage', damage)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("WeaponProfile is immutable, use the unit's WeaponModifiers instead")
+
+    def __delattr__(self, name):
+        raise AttributeError("WeaponProfile is immutable, use the unit's WeaponModifiers instead")
+
+    def __reduce__(self):
+        return WeaponProfile, (self.name, self.weapon_range, self.attacks, self.to_hit, self.to_wound, self.rend,
+                               self.damage)
+
+
+# bonus_attacks are added to every model's attacks, extra_attacks to the unit's total
+ResolvedProfile = namedtuple('ResolvedProfile', ['profile', 'name', 'weapon_range', 'weapon_type', 'attacks',
+                                                 'bonus_attacks', 'extra_attacks', 'to_hit', 'to_wound', 'rend',
+                                                 'damage', 'hit_rerolls', 'wound_rerolls'])
+
+
+class WeaponModifiers:
+    """ Per-unit overlay of ability and buff effects on a shared WeaponProfile """
+
+    __slots__ = ('bonus_attacks', 'extra_attacks', 'bonus_to_hit', 'bonus_to_wound', 'bonus_rend', 'damage',
+                 'hit_rerolls', 'wound_rerolls')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bonus_attacks = 0
         self.extra_attacks = 0
         self.bonus_to_hit = 0
         self.bonus_to_wound = 0
+        self.bonus_rend = 0
+        self.damage = None  # Replaces the profile's damage when set
+        self.hit_rerolls = Rerolls.NONE
+        self.wound_rerolls = Rerolls.NONE
+
+    def resolve(self, profile):
+        return ResolvedProfile(profile, profile.name, profile.weapon_range, profile.weapon_type, profile.attacks,
+                               self.bonus_attacks, self.extra_attacks, profile.to_hit - self.bonus_to_hit,
+                               profile.to_wound - self.bonus_to_wound, profile.rend + self.bonus_rend,
+                               profile.damage if self.damage is None else self.damage, self.hit_rerolls,
+                               self.wound_rerolls)
+
+    def overlay(self, resolved):
+        """ Apply these modifiers on top of a ResolvedProfile, e.g. one resolved with a unit's abilities """
+        return resolved._replace(bonus_attacks=resolved.bonus_attacks + self.bonus_attacks,
+                                 extra_attacks=resolved.extra_attacks + self.extra_attacks,
+                                 to_hit=resolved.to_hit - self.bonus_to_hit,
+                                 to_wound=resolved.to_wound - self.bonus_to_wound,
+                                 rend=resolved.rend + self.bonus_rend,
+                                 damage=resolved.damage if self.damage is None else self.damage,
+                                 hit_rerolls=resolved.hit_rerolls if self.hit_rerolls is Rerolls.NONE
+                                 else self.hit_rerolls,
+                                 wound_rerolls=resolved.wound_rerolls if self.wound_rerolls is Rerolls.NONE
+                                 else self.wound_rerolls)